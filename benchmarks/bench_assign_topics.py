@@ -0,0 +1,98 @@
+"""
+Matching of the saved topics table against all_reviews in
+code/3_topic_modelling.py --transform-only: by review_key, dropping the
+topics of reviews that were edited or deleted since, against the
+previous merge on the REVIEW_KEY columns, which only looked for new
+reviews and kept every saved row.
+
+A share of the reviews is edited, deleted or added between the two
+runs. The new sentences get a topic by hand, as the saved model would
+give them one, and the per-app topic counts are checked to count every
+current review exactly once, so an edited review only by its new copy.
+
+Run from the project root, e.g.
+python benchmarks/bench_assign_topics.py --rows 1000000 --changed 0.01
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+topic_modelling = importlib.import_module('3_topic_modelling')
+
+
+def synthetic_reviews(rows, n_apps=20, seed=0):
+    rng = np.random.default_rng(seed)
+    app_id = rng.integers(0, n_apps, size=rows)
+    df = pd.DataFrame({
+        'app_id': app_id,
+        'app_name': np.array(['App{}'.format(i) for i in range(n_apps)])[app_id],
+        'username': np.array(['user{}'.format(i) for i in range(rows)]),
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 365*24*3600, size=rows), unit='s'),
+        'title': np.array(['title {}'.format(i) for i in range(1000)])[rng.integers(0, 1000, size=rows)],
+        'review': np.array(['review {}'.format(i) for i in range(rows)]),
+        'rating': rng.integers(1, 6, size=rows),
+    })
+    df.insert(0, 'review_key', storage.review_keys(df))
+    return df
+
+
+def with_topics(df, seed=0):
+    topic_id = np.random.default_rng(seed).integers(-1, 50, size=len(df))
+    return df.assign(topic_id=topic_id, topic_keywords=['keywords_{}'.format(id) for id in topic_id])
+
+
+def match_previous(df_topics, df):
+    # the previous matching, kept for comparison
+    df = df.merge(df_topics[storage.REVIEW_KEY].drop_duplicates(), on=storage.REVIEW_KEY, how='left', indicator=True)
+    return df_topics, df[df['_merge']=='left_only'].drop(columns='_merge'), 0
+
+
+def topic_counts(df_topics, app_names):
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs('data/topics/')
+    topic_modelling.summarise_topics(df_topics, app_names)
+    return {app_name: storage.read_table('data/topics/topics_{}'.format(app_name.lower()))['count'].sum()
+            for app_name in app_names}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--changed', type=float, default=0.01, help='share of reviews edited, and again deleted and added')
+    args = parser.parse_args()
+
+    saved = synthetic_reviews(args.rows)
+    df_topics = with_topics(saved)
+    app_names = sorted(saved['app_name'].unique())
+
+    # all_reviews of the next run: some reviews edited, some deleted, some added
+    rng = np.random.default_rng(1)
+    n = int(args.rows * args.changed)
+    picked = rng.choice(args.rows, size=2*n, replace=False)
+    edited, deleted = picked[:n], picked[n:]
+    df = saved.copy()
+    df.loc[edited, 'review'] = df.loc[edited, 'review'] + ' (edited)'
+    df = pd.concat([df.drop(index=deleted), synthetic_reviews(n, seed=2).assign(username=lambda d: 'new ' + d['username'])],
+                   ignore_index=True)
+    df['review_key'] = storage.review_keys(df)
+    expected = df.groupby('app_name').size().reindex(app_names, fill_value=0).to_dict()
+
+    for method, match in [('review_key', topic_modelling.match_topics), ('previous', match_previous)]:
+        start = time.perf_counter()
+        kept, new, removed = match(df_topics, df)
+        elapsed = time.perf_counter() - start
+
+        counts = topic_counts(pd.concat([kept, with_topics(new)], ignore_index=True), app_names)
+        print('{:>12} {:>8.2f} s {:>9,d} new {:>9,d} removed   every review counted once: {}'.format(
+            method, elapsed, len(new), removed, counts == expected))
@@ -0,0 +1,121 @@
+"""
+Time to build the Analysis tab figures of one app from the chart cube
+against the previous charts over its raw reviews, for a growing number of
+synthetic reviews, and time to refresh the cube after a scrape of one of
+three apps against recounting every app.
+
+The figures are checked against the previous charts, and the refreshed
+cube against one counted from scratch.
+
+Run from anywhere, e.g.
+python benchmarks/bench_chart_cube.py --rows 100000 1000000 5000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from dash_scripts import chart_cube, storage
+import dash_scripts.dash_functions as dun
+
+APPS = ['Pixlr', 'Crello', 'Layer']
+
+
+def bar_rating(df):
+    # the previous charts, kept for comparison
+    rating = df['rating'].value_counts()
+    return px.bar(x=rating.index, y=rating)
+
+
+def bar_sentiment(df):
+    return go.Figure(data=[go.Bar(name=sentiment, x=counts.index, y=counts)
+                           for sentiment in ['Positive', 'Neutral', 'Negative']
+                           for counts in [df[df['sentiment']==sentiment]['day'].value_counts()]])
+
+
+def bar_version(df, col_name):
+    dff = df.groupby(col_name, observed=True)['rating'].mean()
+    return px.bar(x=dff.index, y=dff)
+
+
+def raw_figures(reviews, app_name):
+    mask = reviews[reviews['app_name'] == app_name]
+    return [bar_rating(mask), bar_sentiment(mask)] + [bar_version(mask, col) for col in ['version_lvl1', 'version_lvl2', 'version_lvl3']]
+
+
+def cube_figures(cube, app_name):
+    mask = cube[cube['app_name'] == app_name]
+    return [dun.bar_rating(mask), dun.bar_sentiment(mask)] + [dun.bar_version(mask, col, '') for col in ['version_lvl1', 'version_lvl2', 'version_lvl3']]
+
+
+def bars(fig):
+    # {(trace, x): y} without empty bars
+    return {(i, str(x)): round(float(y), 9) for i, trace in enumerate(fig.data) for x, y in zip(trace.x, trace.y) if y}
+
+
+def synthetic_reviews(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    rating = rng.integers(1, 6, size=rows)
+    version = rng.integers(0, 300, size=rows)
+
+    reviews = pd.DataFrame({
+        'title': rng.integers(0, 1000, size=rows).astype(str),
+        'review': rng.integers(0, 10**9, size=rows).astype(str),
+        'username': rng.integers(0, 10**6, size=rows).astype(str),
+        'app_name': np.array(APPS)[rng.integers(0, len(APPS), size=rows)],
+        'app_id': 1,
+        'rating': rating,
+        'sentiment': np.select([rating > 3, rating < 3], ['Positive', 'Negative'], 'Neutral'),
+        'date': pd.to_datetime(rng.integers(1.5e9, 1.65e9, size=rows), unit='s').strftime('%Y-%m-%d'),
+        'version_lvl1': (version // 100 + 1).astype(str),
+        'version_lvl2': ['{}.{}'.format(v // 100 + 1, v // 10 % 10) for v in version],
+        'version_lvl3': ['{}.{}.{}'.format(v // 100 + 1, v // 10 % 10, v % 10) for v in version],
+    })
+    reviews['day'] = pd.to_datetime(reviews['date']).dt.day_name()
+    return storage.set_dtypes(reviews)
+
+
+def seconds(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000, 5000000])
+    parser.add_argument('--new', type=float, default=0.01, help='share of reviews added by a scrape')
+    args = parser.parse_args()
+
+    print('{:>10} {:>10} {:>10} {:>12} {:>12} {:>12}'.format('reviews', 'cube rows', 'cube ms', 'raw ms', 'refresh s', 'rebuild s'))
+    for rows in args.rows:
+        reviews = synthetic_reviews(rows)
+        cube, _ = seconds(lambda: chart_cube.build_cube(reviews))
+
+        expected, raw = seconds(lambda: raw_figures(reviews, APPS[0]))
+        figures, cubed = seconds(lambda: cube_figures(cube, APPS[0]))
+        for fig, expected_fig in zip(figures, expected):
+            assert bars(fig) == bars(expected_fig)
+
+        # a scrape of one app adds new reviews and replaces a few edited ones
+        scraped = (reviews['app_name'] == APPS[0]).to_numpy()
+        old = reviews[~scraped | (np.arange(rows) < rows * (1 - args.new))]
+        new = reviews.copy()
+        new.loc[new.index[scraped][:10], ['rating', 'sentiment']] = [1, 'Negative']
+        old_cube = chart_cube.build_cube(old)
+
+        refreshed, refresh = seconds(lambda: chart_cube.recount_apps(old_cube, new, [APPS[0]]))
+        rebuilt, rebuild = seconds(lambda: chart_cube.build_cube(new))
+        canonical = lambda cube: cube.astype(str).sort_values(chart_cube.CUBE_DIMENSIONS).reset_index(drop=True)
+        pd.testing.assert_frame_equal(canonical(refreshed), canonical(rebuilt))
+
+        print('{:>10,d} {:>10,d} {:>10.1f} {:>12.1f} {:>12.2f} {:>12.2f}'.format(
+            rows, len(cube), cubed * 1000, raw * 1000, refresh, rebuild))
@@ -0,0 +1,85 @@
+"""
+Runtime of clean_data in code/2_data_cleaning.py against the previous
+row-by-row apply implementation, on a synthetic frame of scraped reviews.
+
+Run from the project root, e.g.
+python benchmarks/bench_clean_data.py --rows 5000000
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'code'))
+data_cleaning = importlib.import_module('2_data_cleaning')
+
+
+def clean_data_apply(df):
+    # the previous day and version steps, kept for comparison
+    df = df.copy()
+    df['day'] = df['date'].apply(lambda x: datetime.strptime(x, '%Y-%m-%d').strftime('%A'))
+
+    def versioning(version):
+        ver_lvls = version.split('.')
+        levels = len(ver_lvls)
+
+        if levels == 1:
+            return ver_lvls[0] + '.0.0.0'
+        elif levels == 2:
+            return ver_lvls[0] + '.' + ver_lvls[1] + '.0.0'
+        elif levels == 3:
+            return version
+
+    df['version'] = df['version'].apply(versioning)
+
+    df['version_lvl1'] = df['version'].apply(lambda x: x.split('.')[0])
+    df['version_lvl2'] = df['version'].apply(lambda x: x.split('.')[0] + '.' + x.split('.')[1])
+    df['version_lvl3'] = df['version'].apply(lambda x: x.split('.')[0] + '.' + x.split('.')[1] + '.' + x.split('.')[2])
+
+    return df
+
+
+def synthetic_reviews(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2018-01-01', '2021-12-31').strftime('%Y-%m-%d').to_numpy()
+    versions = np.array(['1', '2.1', '3.4.2', '3.10.1', '4.0', '5.2.11'])
+
+    return pd.DataFrame({
+        'title': 'title',
+        'stars': rng.integers(1, 6, size=rows),
+        'text': 'review',
+        'username': 'user',
+        'version': versions[rng.integers(0, len(versions), size=rows)],
+        'date': dates[rng.integers(0, len(dates), size=rows)],
+        'app_id': 1,
+        'app_name': 'App',
+        'country': 'Malaysia',
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000000)
+    args = parser.parse_args()
+
+    df = synthetic_reviews(args.rows)
+
+    start = time.perf_counter()
+    result = data_cleaning.clean_data(df)
+    vectorized = time.perf_counter() - start
+    print('{:>12} {:>8.2f} s'.format('vectorized', vectorized))
+
+    start = time.perf_counter()
+    expected = clean_data_apply(df)
+    applied = time.perf_counter() - start
+    print('{:>12} {:>8.2f} s'.format('apply', applied))
+    print('speedup: {:.1f}x'.format(applied / vectorized))
+
+    columns = ['day', 'version_lvl1', 'version_lvl2', 'version_lvl3']
+    print('identical:', all((result[col] == expected[col]).all() for col in columns))
@@ -0,0 +1,154 @@
+"""
+Server-side latency and response size of the Analysis tab callbacks in
+demo.py on a synthetic data folder with a large link-words table.
+
+'cold' gives every call a fresh DataStore, so tables are read from disk and
+figures rebuilt on each interaction as before the in-process caches; 'warm'
+reuses one store and figure cache across calls. Times include
+serializing the outputs to JSON. The build and serialization time of the
+figures of an app are reported separately at the end. 'all outputs' is the size of every Analysis output, which is what the
+single update_charts callback sent back for any interaction.
+
+Run from anywhere, e.g.
+python benchmarks/bench_dashboard_callbacks.py --reviews 200000 --linkwords 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import dash
+import numpy as np
+import pandas as pd
+from plotly.utils import PlotlyJSONEncoder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+
+APP = 'Bench'
+
+
+def synthetic_data(folder, n_reviews, n_linkwords, seed=0):
+    rng = np.random.default_rng(seed)
+    os.makedirs(os.path.join(folder, 'data/linkwords'))
+    os.makedirs(os.path.join(folder, 'data/topics'))
+    with open(os.path.join(folder, 'apps.txt'), 'w') as fileOut:
+        fileOut.write('{},1\n'.format(APP))
+
+    words = np.array(['crash', 'photo', 'edit', 'filter', 'save', 'update', 'layer', 'font', 'export', 'ads'])
+    text = lambda size, n: [' '.join(row) for row in words[rng.integers(0, len(words), size=(size, n))]]
+    rating = rng.integers(1, 6, size=n_reviews)
+    version = rng.integers(0, 30, size=n_reviews)
+    topic_id = rng.integers(-1, 50, size=n_reviews)
+
+    reviews = pd.DataFrame({
+        'title': text(n_reviews, 3),
+        'review': text(n_reviews, 25),
+        'username': ['user{}'.format(i) for i in rng.integers(0, n_reviews, size=n_reviews)],
+        'app_name': APP,
+        'app_id': 1,
+        'country': 'Malaysia',
+        'rating': rating,
+        'sentiment': np.select([rating > 3, rating < 3], ['Positive', 'Negative'], 'Neutral'),
+        'date': pd.to_datetime(rng.integers(1.5e9, 1.65e9, size=n_reviews), unit='s').strftime('%Y-%m-%d'),
+        'version_lvl1': (version // 10 + 1).astype(str),
+        'version_lvl2': ['{}.{}'.format(v // 10 + 1, v % 10) for v in version],
+        'version_lvl3': ['{}.{}.0'.format(v // 10 + 1, v % 10) for v in version],
+        'topic_id': topic_id,
+        'topic_keywords': ['keywords_{}'.format(t) for t in topic_id],
+    })
+    reviews['day'] = pd.to_datetime(reviews['date']).dt.day_name()
+    reviews.insert(0, 'review_key', storage.review_keys(reviews))
+    storage.write_table(reviews, os.path.join(folder, 'data/all_reviews_topics'))
+
+    rows = rng.integers(0, n_reviews, size=n_linkwords)
+    linkwords = reviews.iloc[rows].reset_index(drop=True)
+    linkwords['link_words'] = text(n_linkwords, 2)
+    storage.write_table(linkwords[['review_key', 'link_words']],
+                        os.path.join(folder, 'data/linkwords/linkwords_{}'.format(APP.lower())))
+
+    summary = linkwords.groupby('link_words')['rating'].agg(['count', 'mean']).reset_index()
+    summary = summary.rename(columns={'mean': 'rating'}).sort_values('count', ascending=False)
+    summary['sentiment'] = 'Neutral'
+    storage.write_table(summary, os.path.join(folder, 'data/linkwords/linkwords_summary_{}'.format(APP.lower())))
+
+    topics = reviews.groupby(['topic_id', 'topic_keywords']).size().reset_index(name='count')
+    storage.write_table(topics.sort_values('count', ascending=False),
+                        os.path.join(folder, 'data/topics/topics_{}'.format(APP.lower())))
+
+
+def interactions(demo):
+    sort = [{'column_id': 'rating', 'direction': 'desc'}]
+    charts = lambda shown=None: lambda: demo.update_charts(APP, shown)
+    shown = demo.update_charts(APP, None)[-1]
+    summary = lambda: demo.update_linkword_summary(APP, '', 0, [], 20)
+    topics = lambda: demo.update_topics(APP, '', 0, [], 20)
+    linkwords = lambda filter='', page=0, sort_by=[]: \
+        lambda: demo.update_linkwords(APP, filter, page, sort_by, 50)
+
+    # the callbacks each interaction triggers
+    return {
+        'select app': [charts(), summary, linkwords(), topics],
+        'select shown app again': [charts(shown)],
+        'page link-words table': [linkwords(page=3)],
+        'sort link-words table': [linkwords(page=3, sort_by=sort)],
+        'filter link-words table': [linkwords(filter='{review} contains crash')],
+        'open data page': [lambda: [demo.render_page_content('/data')]],
+    }
+
+
+def serialize(callbacks):
+    # outputs left as they are in the browser are not sent
+    outputs = [[output for output in callback() if output is not dash.no_update] for callback in callbacks]
+    return sum(len(json.dumps(output, cls=PlotlyJSONEncoder)) for output in outputs)
+
+
+def measure(fn, repeat, before=None):
+    times = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=200000)
+    parser.add_argument('--linkwords', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    synthetic_data(folder, args.reviews, args.linkwords)
+    os.chdir(folder)
+
+    import demo
+    from dash_scripts.dash_data import DataStore, FigureCache
+
+    def fresh_store():
+        demo.store = DataStore('data')
+        demo.figure_cache = FigureCache()
+
+    all_outputs = serialize(interactions(demo)['select app'])
+
+    print('{:<28} {:>10} {:>10} {:>14} {:>14}'.format('interaction', 'cold ms', 'warm ms', 'payload KB', 'all outputs KB'))
+    for name, callbacks in interactions(demo).items():
+        fn = lambda: serialize(callbacks)
+        cold = measure(fn, args.repeat, before=fresh_store)
+        payload = fn()
+        warm = measure(fn, args.repeat)
+        print('{:<28} {:>10.1f} {:>10.1f} {:>14.1f} {:>14.1f}'.format(name, cold, warm, payload / 1024, all_outputs / 1024))
+
+    fresh_store()
+    demo.update_charts(APP, None)
+    totals = demo.figure_cache.totals
+    print()
+    print('figures of an app built in {:.1f} ms, serialized in {:.1f} ms'.format(totals['build'] * 1000, totals['serialize'] * 1000))
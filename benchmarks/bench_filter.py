@@ -0,0 +1,172 @@
+"""
+Latency of DataTable filter queries through dash_data.Table against the
+previous search_filter_lg, on a synthetic reviews table.
+
+'first' includes compiling the query and building the shadow columns it
+needs, 'repeat' is the same query again on the same table. Results are
+checked against the previous filter for the queries it supported.
+
+The typed-ahead section filters on every keystroke of a word. 'refined'
+reuses the rows of the previous keystroke, 'uncached' forgets all kept
+results before each query.
+
+Run from anywhere, e.g.
+python benchmarks/bench_filter.py --rows 2000000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+from dash_scripts.dash_data import LRUCache, Table
+
+# queries the previous filter supported
+QUERIES = [
+    '{review} contains crash',
+    '{title} contains photo edit',
+    '{rating} contains 5',
+    '{sentiment} contains neg && {review} contains export',
+    '{date} contains 2021-03',
+    '{version_lvl2} contains 2.4',
+]
+
+# operators only the compiled filter supports
+NEW_QUERIES = [
+    '{rating} >= 4',
+    '{title} contains "photo edit" && {date} >= 2020-06-01',
+    '{sentiment} = positive',
+    '{date} datestartswith 2019',
+]
+
+# (column and operator, text typed one character at a time); a number that becomes text must not be refined
+TYPED = [
+    ('{title} contains ', 'export ads'),
+    ('{rating} contains ', '4a'),
+]
+
+
+def split_filter(filter_part):
+    # the previous parser and filter, kept for comparison
+    for operator_type in [['contains ']]:
+        for operator in operator_type:
+            if operator in filter_part:
+                name_part, value_part = filter_part.split(operator, 1)
+                col_name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
+
+                value_part = value_part.strip()
+                if (col_name == 'date') or (col_name == 'version_lvl2'):
+                    value = value_part
+                else:
+                    try:
+                        value = float(value_part)
+                    except ValueError:
+                        value = value_part
+
+                if isinstance(value, str):
+                    value = value.lower()
+
+                return col_name, operator_type[0].strip(), value
+
+    return [None] * 3
+
+
+def search_filter_lg(filter, df):
+    dff = df
+    filtering_expressions = filter.split(' && ')
+
+    for filter_part in filtering_expressions:
+        col_name, operator, filter_value = split_filter(filter_part)
+
+        if (col_name == 'date') or (col_name == 'version_lvl2') or (col_name == 'version_lvl3'):
+            filter_value = str(filter_value)
+
+        if operator == 'contains':
+            if isinstance(filter_value, float):
+                dff = dff[dff[col_name]==int(filter_value)]
+            else:
+                df_lower = dff.copy()[col_name].str.lower()
+                dff = dff.loc[df_lower.str.contains(filter_value)]
+
+    return dff
+
+
+def synthetic_reviews(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    words = np.array(['crash', 'Photo', 'edit', 'filter', 'save', 'update', 'layer', 'font', 'export', 'ads'])
+    text = lambda n: [' '.join(row) for row in words[rng.integers(0, len(words), size=(rows, n))]]
+    rating = rng.integers(1, 6, size=rows)
+    version = rng.integers(0, 30, size=rows)
+
+    reviews = pd.DataFrame({
+        'title': text(3),
+        'review': text(25),
+        'rating': rating,
+        'sentiment': np.select([rating > 3, rating < 3], ['Positive', 'Negative'], 'Neutral'),
+        'date': pd.to_datetime(rng.integers(1.5e9, 1.65e9, size=rows), unit='s').strftime('%Y-%m-%d'),
+        'version_lvl2': ['{}.{}'.format(v // 10 + 1, v % 10) for v in version],
+    })
+    return storage.set_dtypes(reviews)
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    reviews = synthetic_reviews(args.rows)
+    table = Table(reviews)
+
+    print('{:<56} {:>10} {:>10} {:>12} {:>10}'.format('query', 'first ms', 'repeat ms', 'previous ms', 'rows'))
+    for query in QUERIES + NEW_QUERIES:
+        start = time.perf_counter()
+        result = table.filter(query)
+        first = (time.perf_counter() - start) * 1000
+
+        if query in QUERIES:
+            expected = search_filter_lg(query, reviews)
+            assert result.index.equals(expected.index), query
+            previous = '{:.1f}'.format(measure(lambda: search_filter_lg(query, reviews), args.repeat))
+        else:
+            previous = '-'
+
+        repeat = measure(lambda: table.filter(query), args.repeat)
+        print('{:<56} {:>10.1f} {:>10.1f} {:>12} {:>10,d}'.format(query, first, repeat, previous, len(result)))
+
+    print()
+    print('{:<56} {:>10} {:>10} {:>10}'.format('typed-ahead query', 'refined ms', 'uncached ms', 'rows'))
+    for prefix, word in TYPED:
+        typed = [prefix + word[:n] for n in range(1, len(word) + 1)]
+        for n, query in enumerate(typed):
+            def uncached():
+                table.results = LRUCache(table.results.maxsize, table.results.weigh)
+                return table.filter(query)
+
+            expected = uncached()
+            table.results = LRUCache(table.results.maxsize, table.results.weigh)
+            for previous in typed[:n]:
+                table.filter(previous)
+
+            start = time.perf_counter()
+            result = table.filter(query)
+            refined = (time.perf_counter() - start) * 1000
+
+            assert result.index.equals(expected.index), query
+            print('{:<56} {:>10.1f} {:>10.1f} {:>10,d}'.format(query, refined, measure(uncached, args.repeat), len(result)))
@@ -0,0 +1,91 @@
+"""
+Import time of each entry point, from `python -X importtime`, with its
+heaviest top-level imports. Entry points are imported in a fresh
+interpreter: the dashboard by importing demo.py, the pipeline scripts by
+running them with --help, which imports them and exits.
+
+Every entry point also lists modules it must not import, e.g. seaborn
+in the dashboard or BERTopic in the cleaning step; importing one of them
+is reported and makes the benchmark exit with an error. A script whose
+own dependencies are not installed is reported as failed.
+
+Run from anywhere, e.g.
+python benchmarks/bench_import_time.py --repeat 5
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ['bertopic', 'sentence_transformers', 'torch', 'spacy', 'seaborn', 'matplotlib']
+
+# (entry point, arguments of python, modules it must not import); spacy itself imports torch
+ENTRY_POINTS = [
+    ('demo.py', ['-c', 'import demo'], HEAVY),
+    ('code/1_web_scraping.py', ['code/1_web_scraping.py', '--help'], HEAVY),
+    ('code/2_data_cleaning.py', ['code/2_data_cleaning.py', '--help'], HEAVY),
+    ('code/3_topic_modelling.py', ['code/3_topic_modelling.py', '--help'], HEAVY),
+    ('code/4_linkwords.py', ['code/4_linkwords.py', '--help'], ['bertopic', 'sentence_transformers', 'seaborn', 'matplotlib']),
+]
+
+
+def import_times(args):
+    """
+    (wall seconds, {module: cumulative seconds}, every imported module) of
+    one run, or (None, error) if it failed. The modules timed are those
+    imported at the top level, or directly by the module of `-c import`.
+    """
+    expanded = args[1].split()[-1] if args[0] == '-c' else None
+    start = time.perf_counter()
+    run = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if run.returncode != 0:
+        return None, run.stderr.strip().splitlines()[-1]
+
+    top, modules = {}, set()
+    for line in run.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        modules.add(name)
+        if (level == 0 and name != expanded) or (level == 1 and expanded):
+            top[name] = int(cumulative) / 10**6
+    return (wall, top, modules), None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=5)
+    args = parser.parse_args()
+
+    # what the interpreter imports before running anything
+    startup = import_times(['-c', 'pass'])[0][2]
+
+    failed = False
+    print('{:<28} {:>8} {:>10}  {}'.format('entry point', 'wall s', 'imports s', 'heaviest imports'))
+    for name, python_args, forbidden in ENTRY_POINTS:
+        runs = [import_times(python_args) for _ in range(args.repeat)]
+        if runs[0][0] is None:
+            print('{:<28} failed: {}'.format(name, runs[0][1]))
+            continue
+
+        # the fastest run, the one least disturbed by the rest of the machine
+        wall, top, modules = min((result for result, _ in runs), key=lambda result: result[0])
+        top = {module: seconds for module, seconds in top.items() if module not in startup}
+        heaviest = sorted(top.items(), key=lambda item: -item[1])[:args.top]
+        print('{:<28} {:>8.2f} {:>10.2f}  {}'.format(name, wall, sum(top.values()),
+                                                     ', '.join('{} {:.2f}'.format(module, seconds) for module, seconds in heaviest)))
+
+        imported = sorted(module for module in forbidden if module in modules)
+        if imported:
+            print('{:<28} imports {}'.format('', ', '.join(imported)))
+            failed = True
+
+    sys.exit(failed)
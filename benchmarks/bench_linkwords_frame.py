@@ -0,0 +1,89 @@
+"""
+Runtime and peak memory of building df_link in code/4_linkwords.py, comparing
+the columnar builder against the old per-review pd.concat accumulation.
+
+Run from the project root, e.g.
+python benchmarks/bench_linkwords_frame.py --sizes 10000 100000 1000000
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+linkwords = importlib.import_module('4_linkwords')
+
+
+def build_linkwords_concat(df, linkwords):
+    # the previous implementation, kept for comparison
+    df_link = pd.DataFrame()
+
+    for index, overall_lw in enumerate(linkwords):
+        df_row = df.iloc[index].to_frame().T
+        df_row_replicated = pd.DataFrame(np.repeat(df_row.values, len(overall_lw), axis=0), columns=df.columns)
+        df_row_replicated['link_words'] = overall_lw
+        df_link = pd.concat([df_link, df_row_replicated])
+
+    df_link['rating'] = df_link['rating'].astype(str).astype(int)
+
+    return df_link
+
+
+def synthetic_reviews(reviews, size, seed=0):
+    rng = np.random.default_rng(seed)
+    df = reviews.sample(n=size, replace=True, random_state=seed).reset_index(drop=True)
+
+    # 0-6 link words per review
+    counts = rng.integers(0, 7, size=size)
+    words = [['word{} phrase{}'.format(i, j) for j in range(n)] for i, n in enumerate(counts)]
+
+    return df, words
+
+
+def measure(builder, df, words):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(df, words)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak / 2**20
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default='data/all_reviews')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--max-concat', type=int, default=100000,
+                        help='largest size to run the quadratic concat builder on')
+    args = parser.parse_args()
+
+    reviews = storage.read_table(args.input)
+
+    print('{:>10} {:>10} {:>12} {:>12}'.format('reviews', 'builder', 'seconds', 'peak MiB'))
+    for size in args.sizes:
+        df, words = synthetic_reviews(reviews, size)
+
+        result, elapsed, peak = measure(linkwords.build_linkwords, df, words)
+        print('{:>10,d} {:>10} {:>12.2f} {:>12.1f}'.format(size, 'columnar', elapsed, peak))
+
+        if size > args.max_concat:
+            print('{:>10,d} {:>10} {:>12} {:>12}'.format(size, 'concat', 'skipped', '-'))
+            continue
+
+        expected, elapsed, peak = measure(build_linkwords_concat, df, words)
+        print('{:>10,d} {:>10} {:>12.2f} {:>12.1f}'.format(size, 'concat', elapsed, peak))
+
+        # the written csv must not change
+        if result.to_csv(index=False) != expected.reset_index(drop=True).to_csv(index=False):
+            print('{:>10,d} output MISMATCH'.format(size))
@@ -0,0 +1,73 @@
+"""
+Memory of the link-words table of an app as loaded by the dashboard, for
+the previous layout repeating every review column on each link word,
+the same layout with categorical text columns, and link words stored by
+review key and joined to the reviews the dashboard already keeps.
+
+Sizes are per million link words; the reviews table is shared with the
+Reviews tab and reported on its own. The joined table is checked against
+the previous one.
+
+Run from anywhere, e.g.
+python benchmarks/bench_linkwords_memory.py --reviews 300000 --linkwords 1000000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from bench_dashboard_callbacks import APP, synthetic_data
+from dash_scripts import storage
+from dash_scripts.dash_data import DataStore, load_linkwords
+
+
+def megabytes(df):
+    return df.memory_usage(index=True, deep=True).sum() / 2**20
+
+
+def categorical(df):
+    return df.astype({col: 'category' for col in df.columns if df[col].dtype == object})
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=300000)
+    parser.add_argument('--linkwords', type=int, default=1000000)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    synthetic_data(folder, args.reviews, args.linkwords)
+    store = DataStore(os.path.join(folder, 'data'))
+    reviews = store.reviews()
+
+    # the previous layout, written by joining the link words back to their reviews
+    name = os.path.join(folder, 'data/linkwords/linkwords_{}'.format(APP.lower()))
+    links = storage.read_table(name)
+    topics = storage.read_table(os.path.join(folder, 'data/all_reviews_topics'))
+    denormalized = links.merge(topics.drop(columns=['topic_id', 'topic_keywords']), on='review_key', how='left')
+    storage.write_table(denormalized.drop(columns='review_key'), name + '_denormalized')
+
+    start = time.perf_counter()
+    previous = load_linkwords(name + '_denormalized')
+    previous_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = store.linkwords(APP)
+    joined_load = time.perf_counter() - start
+    pd.testing.assert_frame_equal(table.filter('').astype(str), previous.astype(str), check_index_type=False)
+
+    per_million = 10**6 / args.linkwords
+    own = megabytes(table.df) + table.parent_rows.nbytes / 2**20
+
+    print('{:<40} {:>14} {:>10}'.format('layout', 'MB / M words', 'load s'))
+    print('{:<40} {:>14.1f} {:>10.2f}'.format('all review columns', megabytes(previous) * per_million, previous_load))
+    print('{:<40} {:>14.1f} {:>10}'.format('all review columns, categorical', megabytes(categorical(previous)) * per_million, '-'))
+    print('{:<40} {:>14.1f} {:>10.2f}'.format('review key, joined per page', own * per_million, joined_load))
+    print()
+    print('shared reviews table: {:.1f} MB for {:,d} reviews'.format(megabytes(reviews), len(reviews)))
@@ -0,0 +1,50 @@
+"""
+Throughput of the link-word extraction in code/4_linkwords.py at different
+spaCy worker counts.
+
+Run from the project root, e.g.
+python benchmarks/bench_linkwords_parse.py --docs 20000 --workers 1 2 4
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import spacy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+linkwords = importlib.import_module('4_linkwords')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default='data/all_reviews')
+    parser.add_argument('--docs', type=int, default=10000, help='number of reviews to parse (input is repeated if shorter)')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    reviews = storage.read_table(args.input)['review'].astype(str).tolist()
+    texts = (reviews * (args.docs // len(reviews) + 1))[:args.docs]
+
+    nlp = spacy.load('en_core_web_sm', disable=linkwords.UNUSED_PIPES)
+
+    # baseline: one nlp() call per review with the full pipeline, as before
+    nlp_full = spacy.load('en_core_web_sm')
+    start = time.perf_counter()
+    expected = [linkwords.extract_linkwords(nlp_full(text)) for text in texts]
+    elapsed = time.perf_counter() - start
+    print('{:>12} {:>10.1f} docs/sec'.format('serial', len(texts) / elapsed))
+
+    for n_process in args.workers:
+        start = time.perf_counter()
+        result = list(linkwords.parse_reviews(nlp, texts, batch_size=args.batch_size, n_process=n_process))
+        elapsed = time.perf_counter() - start
+
+        status = 'ok' if result == expected else 'MISMATCH'
+        print('{:>12} {:>10.1f} docs/sec  {}'.format('n_process={}'.format(n_process), len(texts) / elapsed, status))
@@ -0,0 +1,62 @@
+"""
+Per-doc cost of the link-word rules in code/4_linkwords.py: the five
+separate rule passes against the single-pass RuleEngine. Every doc is also
+checked for identical output, so this doubles as the parity check.
+
+Run from the project root, e.g.
+python benchmarks/bench_linkwords_rules.py --docs 5000
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+
+import spacy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+linkwords = importlib.import_module('4_linkwords')
+
+
+def rule_passes(doc):
+    return linkwords.rule1(doc) + linkwords.rule2(doc) + linkwords.rule3(doc) \
+           + linkwords.rule4(doc) + linkwords.rule5(doc)
+
+
+def time_per_doc(extract, docs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for doc in docs:
+            extract(doc)
+        best = min(best, time.perf_counter() - start)
+
+    return best / len(docs) * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default='data/all_reviews')
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    reviews = storage.read_table(args.input)['review'].astype(str).tolist()
+    texts = (reviews * (args.docs // len(reviews) + 1))[:args.docs]
+
+    nlp = spacy.load('en_core_web_sm', disable=linkwords.UNUSED_PIPES)
+    docs = list(nlp.pipe(texts))
+
+    mismatches = [i for i, doc in enumerate(docs) if rule_passes(doc) != linkwords.extract_linkwords(doc)]
+    print('parity: {} of {} docs differ'.format(len(mismatches), len(docs)))
+    for i in mismatches[:5]:
+        print('  ', texts[i])
+
+    print('{:>12} {:>10.1f} us/doc'.format('rule1-5', time_per_doc(rule_passes, docs, args.repeat)))
+    print('{:>12} {:>10.1f} us/doc'.format('RuleEngine', time_per_doc(linkwords.extract_linkwords, docs, args.repeat)))
+
+    sys.exit(1 if mismatches else 0)
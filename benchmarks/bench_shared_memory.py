@@ -0,0 +1,101 @@
+"""
+Memory of several dashboard worker processes serving the same synthetic
+dataset, read from Parquet into private frames or memory-mapped from the
+Arrow copies written by `python -m dash_scripts.storage --arrow`.
+
+'load' starts every worker empty and lets it load the tables, 'fork'
+loads them once and forks the workers, as gunicorn --preload does. Each
+worker then filters and pages the link-words table and reports its
+proportional set size (shared pages split between the processes that
+map them) and its private memory, from /proc/self/smaps_rollup, so the
+numbers are only available on Linux.
+
+Run from anywhere, e.g.
+python benchmarks/bench_shared_memory.py --reviews 300000 --linkwords 1000000 --workers 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from bench_dashboard_callbacks import APP, synthetic_data
+from dash_scripts import storage
+from dash_scripts.dash_data import DataStore
+
+store = None
+
+
+def memory():
+    # (pss, private) of this process in MB
+    with open('/proc/self/smaps_rollup') as fileIn:
+        fields = dict(line.split(':', 1) for line in fileIn if ':' in line and not line.startswith('0'))
+    kilobytes = lambda *names: sum(int(fields[name].split()[0]) for name in names)
+    return kilobytes('Pss') / 1024, kilobytes('Private_Clean', 'Private_Dirty') / 1024
+
+
+def load(folder):
+    global store
+    store = DataStore(os.path.join(folder, 'data'))
+    store.reviews()
+    store.linkwords(APP)
+
+
+def serve(folder, barrier, results):
+    start = time.perf_counter()
+    if store is None:
+        load(folder)
+    loaded = time.perf_counter() - start
+
+    table = store.linkwords(APP)
+    table.page('{review} contains crash', [{'column_id': 'date', 'direction': 'desc'}], 3, 50)
+    table.page('{rating} >= 4', [], 0, 50)
+
+    # measured while every worker is alive, so shared pages are split between them
+    barrier.wait()
+    results.put((loaded,) + memory())
+    barrier.wait()
+
+
+def run(folder, workers, method):
+    context = multiprocessing.get_context('fork')
+    barrier, results = context.Barrier(workers), context.Queue()
+    if method == 'fork':
+        load(folder)
+
+    processes = [context.Process(target=serve, args=(folder, barrier, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    global store
+    store = None
+    return [sum(values) / len(values) for values in zip(*measured)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reviews', type=int, default=300000)
+    parser.add_argument('--linkwords', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    parquet = tempfile.mkdtemp()
+    synthetic_data(parquet, args.reviews, args.linkwords)
+    arrow = os.path.join(tempfile.mkdtemp(), 'arrow')
+    shutil.copytree(parquet, arrow)
+    for name in ['data/all_reviews_topics', 'data/linkwords/linkwords_{}'.format(APP.lower())]:
+        storage.export_arrow(os.path.join(arrow, name))
+
+    print('{:<10} {:<8} {:>12} {:>16} {:>18}'.format('tables', 'workers', 'load s', 'PSS MB / worker', 'private MB / worker'))
+    for label, folder in [('parquet', parquet), ('arrow', arrow)]:
+        for method in ['load', 'fork']:
+            loaded, pss, private = run(folder, args.workers, method)
+            print('{:<10} {:<8} {:>12.2f} {:>16.1f} {:>18.1f}'.format(label, method, loaded, pss, private))
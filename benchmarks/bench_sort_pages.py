@@ -0,0 +1,64 @@
+"""
+Latency of flipping through pages of a sorted DataTable with
+dash_data.Table.page against the previous filter, sort_values and slice,
+on the synthetic reviews table of bench_filter.py.
+
+'first' is the first page of a sort, which builds the presorted orders
+it needs, 'flip' a later page of the same sort. Every page is checked
+against a stable sort_values.
+
+Run from anywhere, e.g.
+python benchmarks/bench_sort_pages.py --rows 2000000
+"""
+
+import argparse
+import time
+
+from bench_filter import measure, search_filter_lg, synthetic_reviews
+from dash_scripts.dash_data import Table
+
+SIZE = 50
+
+# (filter, sort_by)
+SORTS = [
+    ('', [('date', 'desc')]),
+    ('', [('rating', 'asc'), ('date', 'desc')]),
+    ('{review} contains export', [('title', 'asc')]),
+    ('{review} contains export', [('sentiment', 'desc'), ('version_lvl2', 'asc'), ('date', 'asc')]),
+]
+
+
+def sort_page(df, filter, sort_by, page):
+    # the previous callback steps, with a stable sort so ties keep table order
+    dff = search_filter_lg(filter, df)
+    if sort_by:
+        dff = dff.sort_values([col for col, _ in sort_by], ascending=[direction == 'asc' for _, direction in sort_by],
+                              kind='mergesort')
+    return dff.iloc[page*SIZE : (page+1)*SIZE]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2000000)
+    parser.add_argument('--page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    reviews = synthetic_reviews(args.rows)
+    table = Table(reviews)
+
+    print('{:<28} {:<70} {:>9} {:>9} {:>12}'.format('filter', 'sort', 'first ms', 'flip ms', 'previous ms'))
+    for filter, sort_by in SORTS:
+        sort = [{'column_id': col, 'direction': direction} for col, direction in sort_by]
+        page = lambda n: table.page(filter, sort, n, SIZE)[0]
+
+        start = time.perf_counter()
+        page(0)
+        first = (time.perf_counter() - start) * 1000
+
+        for n in (0, 1, args.page):
+            assert page(n).index.equals(sort_page(reviews, filter, sort_by, n).index), (filter, sort_by, n)
+
+        flip = measure(lambda: page(args.page + 1), args.repeat)
+        previous = measure(lambda: sort_page(reviews, filter, sort_by, args.page + 1), args.repeat)
+        print('{:<28} {:<70} {:>9.1f} {:>9.1f} {:>12.1f}'.format(filter, str(sort_by), first, flip, previous))
@@ -0,0 +1,112 @@
+"""
+Per-app summary files of code/3_topic_modelling.py and code/4_linkwords.py:
+the single groupby against the previous Pool.starmap over apps, which
+pickled the whole frame into a worker for every app. Both write into a
+temporary directory and their files are compared.
+
+Run from the project root, e.g.
+python benchmarks/bench_summaries.py --rows 2000000 --apps 50
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+import time
+from itertools import repeat
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'code'))
+sys.path.insert(0, ROOT)
+from dash_scripts import storage
+linkwords = importlib.import_module('4_linkwords')
+topic_modelling = importlib.import_module('3_topic_modelling')
+
+
+def summarise_linkwords_pool(app_name, df):
+    # the previous per-app implementation, kept for comparison
+    dff = df[df['app_name']==app_name]
+    dff = dff.groupby('link_words')['rating']\
+             .agg(['count','mean'])\
+             .sort_values(by=['count','mean'], ascending=[False,False])\
+             .reset_index()
+    dff = dff.rename(columns={'mean':'rating'})
+    dff['rating'] = dff['rating'].round(2)
+
+    conditions = [(dff['rating'] > 3.5),
+                  (dff['rating'] < 2.5),
+                  (dff['rating'] >= 2.5) & (dff['rating'] <= 3.5)
+                 ]
+    values = ['Positive', 'Negative', 'Neutral']
+    dff['sentiment'] = np.select(conditions, values)
+
+    storage.write_table(dff, 'data/linkwords/linkwords_summary_{}'.format(app_name.lower()))
+
+
+def summarise_topics_pool(app_name, df):
+    # the previous per-app implementation, kept for comparison
+    df = df[df['app_name']==app_name]
+    df = df.groupby(by=['topic_id','topic_keywords']).size()\
+           .sort_values(ascending=False, kind='stable')\
+           .reset_index(name='count')
+
+    storage.write_table(df, 'data/topics/topics_{}'.format(app_name.lower()))
+
+
+def synthetic_frame(rows, n_apps, seed=0):
+    rng = np.random.default_rng(seed)
+    topic_id = rng.integers(-1, 200, size=rows)
+
+    return pd.DataFrame({
+        'app_name': np.array(['App{}'.format(i) for i in range(n_apps)])[rng.integers(0, n_apps, size=rows)],
+        'rating': rng.integers(1, 6, size=rows),
+        'link_words': np.array(['word{}'.format(i) for i in range(5000)])[rng.integers(0, 5000, size=rows)],
+        'topic_id': topic_id,
+        'topic_keywords': np.array(['keywords_{}'.format(i) for i in range(-1, 200)])[topic_id + 1],
+    })
+
+
+def read_outputs(folder):
+    names = sorted(os.path.splitext(name)[0] for name in os.listdir(folder))
+    return {name: storage.read_table(os.path.join(folder, name)) for name in names}
+
+
+def identical(outputs, expected):
+    return outputs.keys() == expected.keys() and all(outputs[name].equals(expected[name]) for name in outputs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--apps', type=int, default=20)
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows, args.apps)
+    app_names = sorted(df['app_name'].unique())
+    outputs = {}
+
+    for method in ['groupby', 'pool']:
+        os.chdir(tempfile.mkdtemp())
+        os.makedirs('data/linkwords/')
+        os.makedirs('data/topics/')
+
+        start = time.perf_counter()
+        if method == 'groupby':
+            linkwords.summarise_linkwords(df, app_names)
+            topic_modelling.summarise_topics(df, app_names)
+        else:
+            with Pool(cpu_count()) as pool:
+                pool.starmap(summarise_linkwords_pool, zip(app_names, repeat(df)))
+                pool.starmap(summarise_topics_pool, zip(app_names, repeat(df)))
+        elapsed = time.perf_counter() - start
+
+        outputs[method] = (read_outputs('data/linkwords'), read_outputs('data/topics'))
+        print('{:>8} {:>8.2f} s'.format(method, elapsed))
+
+    print('linkword summaries identical:', identical(outputs['groupby'][0], outputs['pool'][0]))
+    print('topic summaries identical:   ', identical(outputs['groupby'][1], outputs['pool'][1]))
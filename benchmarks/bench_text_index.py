@@ -0,0 +1,81 @@
+"""
+Latency of contains filters answered by dash_filter.TextIndex against a
+scan of the same shadow column, for growing synthetic review corpora with
+a Zipf-distributed vocabulary. Results are checked against the scan.
+
+Run from anywhere, e.g.
+python benchmarks/bench_text_index.py --rows 10000 100000 1000000
+"""
+
+import argparse
+import os
+import statistics
+import string
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from dash_scripts import dash_filter
+
+# a frequent word, a rare word, a word prefix, a phrase and a pattern with no index words
+PATTERNS = ['the', 'crash', 'cras', 'keeps crashing', '!!']
+
+
+def synthetic_reviews(rows, vocab_size=50000, words_per_review=30, seed=0):
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(string.ascii_lowercase))
+    vocab = np.array([''.join(rng.choice(letters, size=rng.integers(2, 10))) for _ in range(vocab_size)], dtype=object)
+    vocab[:3] = ['the', 'app', 'good']
+
+    words = vocab[np.minimum(rng.zipf(1.2, size=(rows, words_per_review)) - 1, vocab_size - 1)]
+    reviews = [' '.join(row) for row in words]
+
+    # plant the rare patterns in a known share of the reviews
+    for i in rng.choice(rows, size=max(rows // 1000, 1), replace=False):
+        reviews[i] += ' App keeps crashing!!'
+    for i in rng.choice(rows, size=max(rows // 500, 1), replace=False):
+        reviews[i] = 'Crash. ' + reviews[i]
+
+    return pd.Series(reviews)
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print('{:>10} {:>9} {:<16} {:>10} {:>10} {:>10}'.format('rows', 'build s', 'pattern', 'index ms', 'scan ms', 'matches'))
+    for rows in args.rows:
+        strings, _ = dash_filter.lower_strings(synthetic_reviews(rows))
+
+        start = time.perf_counter()
+        index = dash_filter.TextIndex(strings)
+        build = time.perf_counter() - start
+
+        for pattern in PATTERNS:
+            scan = lambda: dash_filter.match_text(strings, 'contains', pattern)
+            expected = scan()
+            result = index.contains(pattern)
+
+            if result is None:
+                indexed = '-'
+            else:
+                assert np.array_equal(result, expected), pattern
+                indexed = '{:.2f}'.format(measure(lambda: index.contains(pattern), args.repeat))
+
+            print('{:>10,d} {:>9.2f} {:<16} {:>10} {:>10.2f} {:>10,d}'.format(
+                rows, build, pattern, indexed, measure(scan, args.repeat), expected.sum()))
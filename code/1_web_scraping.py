@@ -1,33 +1,156 @@
-from datetime import datetime
-from itertools import repeat
-from multiprocessing import Pool, cpu_count
-import numpy as np
+import argparse
+import json
 import os
 import pandas as pd
-import re
-import spacy
+import sys
 
-from bertopic import BERTopic
-from itunes_app_review_scraper import iTunesScraper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dash_scripts import storage
+from review_fetcher import ReviewFetcher
+from storefronts import COUNTRY_NAMES
 
+REVIEW_COLUMNS = ['review_id', 'title', 'stars', 'text', 'username', 'version', 'date', 'country']
 
-def scrape_app(app_name, app_id):
-    reviews = iTunesScraper.get_reviews(app_id=app_id, country='MY')
-    dff = pd.DataFrame(reviews)
-    
-    dff['app_id'] = app_id
-    dff['app_name'] = app_name
-    dff['country'] = 'Malaysia'
+# columns telling reviews apart in tables saved before the scraper kept their review_id
+CONTENT_COLUMNS = ['username', 'title', 'text']
+
+# newest review date seen per app and country
+MARKS_FILE = 'data/app_reviews/high_water_marks.json'
+
+
+def load_marks(filename):
+    if not os.path.exists(filename):
+        return {}
+
+    with open(filename, encoding='utf8') as fileIn:
+        return json.load(fileIn)
+
+
+def save_marks(marks, filename):
+    with open(filename + '.tmp', 'w', encoding='utf8') as fileOut:
+        json.dump(marks, fileOut, indent=2, sort_keys=True)
+    os.replace(filename + '.tmp', filename)
+
+
+def as_text(df):
+    return df.astype(object).where(df.notna(), None).astype(str)
+
+
+def with_ids(old, new):
+    # old with a review_id column, where reviews saved without one that new holds again are left out
+    if 'review_id' not in old.columns:
+        old = old.assign(review_id=None)
+
+    content = lambda df: pd.MultiIndex.from_frame(as_text(df[CONTENT_COLUMNS]))
+    refetched = old['review_id'].isna() & content(old).isin(content(new))
+    return old[~refetched]
+
+
+def merge_reviews(old, new):
+    # new copies of a review replace old ones, e.g. after the user edited it
+    dff = pd.concat([new, with_ids(old, new)], ignore_index=True)
+    duplicated = dff['review_id'].notna() & dff.duplicated('review_id')
+
+    return dff[~duplicated].reset_index(drop=True)
 
-    filename = 'data/app_reviews/reviews_{}.csv'.format(app_name.lower())
-    dff.to_csv(filename, index=False, encoding='utf8')
+
+def changed_reviews(old, new):
+    # number of reviews in new that old does not hold as they are, i.e. added or edited since; reviews
+    # old saved without a review_id are not known, so new copies of them count as well
+    old = with_ids(old, new)
+    old = as_text(old.dropna(subset=['review_id']).drop_duplicates('review_id').set_index('review_id')[REVIEW_COLUMNS[1:]])
+    new = as_text(new.set_index('review_id')[REVIEW_COLUMNS[1:]])
+
+    seen = new.index.isin(old.index)
+    edited = (new[seen] != old.loc[new.index[seen]]).any(axis=1)
+    return int((~seen).sum() + edited.sum())
+
+
+def scrape_apps(apps, countries, fetcher, marks):
+    # a table saved without review ids cannot tell which fetched reviews it already holds, so its app is
+    # fetched in full and the reviews it has are matched by their content instead
+    for app_name, app_id in apps.items():
+        name = 'data/app_reviews/reviews_{}'.format(app_name.lower())
+        if os.path.exists(storage.table_file(name)) and 'review_id' not in storage.table_columns(name):
+            print('{} has no review ids, fetching every review of {}.'.format(storage.table_file(name), app_name))
+            marks = {id: country_marks for id, country_marks in marks.items() if id != app_id}
+
+    def seen_before(app_id, country, reviews):
+        # the feed is sorted by most recent, so paging can stop at the first review older than the mark
+        mark = marks.get(app_id, {}).get(country)
+        return mark is not None and reviews[-1]['date'] < mark
+
+    # collect pages of every app as they arrive, then update one table per app
+    pages = {app_id: [] for app_id in apps.values()}
+    for app_id, country, page, reviews in fetcher.fetch(apps.values(), countries, stop=seen_before):
+        for review in reviews:
+            review['country'] = COUNTRY_NAMES[country]
+        pages[app_id].append((country, page, reviews))
+
+    new_marks = {}
+    for app_name, app_id in apps.items():
+        reviews = [review for _, _, page_reviews in sorted(pages[app_id], key=lambda x: x[:2])
+                          for review in page_reviews]
+        dff = pd.DataFrame(reviews, columns=REVIEW_COLUMNS)
+
+        dff['app_id'] = int(app_id)
+        dff['app_name'] = app_name
+
+        name = 'data/app_reviews/reviews_{}'.format(app_name.lower())
+        exists = os.path.exists(storage.table_file(name))
+        keyed = not exists or 'review_id' in storage.table_columns(name)
+        if exists:
+            old = storage.read_table(name)
+            changed = changed_reviews(old, dff)
+            dff = merge_reviews(old, dff)
+            added = len(dff) - len(old)
+        else:
+            changed = added = len(dff)
+
+        # tables are only written when they change, so later steps can tell which apps got new reviews
+        if changed or not exists:
+            storage.write_table(dff, name)
+            if keyed:
+                print('Saved {} new and {} edited reviews of {}, {} in total.'.format(added, changed - added, app_name, len(dff)))
+            else:
+                print('Saved {} new reviews of {} and the review ids of {} it had, {} in total.'.format(added, app_name, changed - added, len(dff)))
+        else:
+            print('No new reviews of {}, {} in total.'.format(app_name, len(dff)))
+
+        # move the marks of every fetched country to its newest review
+        for country, _, page_reviews in pages[app_id]:
+            dates = [review['date'] for review in page_reviews]
+            mark = new_marks.get(app_id, {}).get(country) or marks.get(app_id, {}).get(country)
+            if mark is not None:
+                dates.append(mark)
+            if dates:
+                new_marks.setdefault(app_id, {})[country] = max(dates)
+
+    return new_marks
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--countries', nargs='+', default=['MY'], help='storefront country codes')
+    parser.add_argument('--workers', type=int, default=8, help='number of concurrent requests')
+    parser.add_argument('--rate', type=float, default=5.0, help='requests per second per host')
+    parser.add_argument('--full', action='store_true', help='page through every review instead of stopping at already-seen ones')
+    args = parser.parse_args()
+
+    # reviews store the country name, so every storefront must have one
+    countries = [country.upper() for country in args.countries]
+    unknown = [country for country in countries if country not in COUNTRY_NAMES]
+    if unknown:
+        parser.error('unknown storefront country codes: {}'.format(', '.join(unknown)))
+
     with open('apps.txt') as fileIn:
         apps = dict(line.strip().split(',') for line in fileIn)
     
     os.makedirs('data/app_reviews/', exist_ok=True)
 
-    inputs = zip(apps.keys(), apps.values())
-    with Pool(cpu_count()) as pool:
-        pool.starmap(scrape_app, inputs)
\ No newline at end of file
+    marks = load_marks(MARKS_FILE)
+
+    fetcher = ReviewFetcher('data/app_reviews/pages', max_workers=args.workers, rate=args.rate)
+    new_marks = scrape_apps(apps, countries, fetcher, {} if args.full else marks)
+    for app_id, country_marks in new_marks.items():
+        marks.setdefault(app_id, {}).update(country_marks)
+    save_marks(marks, MARKS_FILE)
\ No newline at end of file
@@ -1,19 +1,18 @@
-from datetime import datetime
-from itertools import repeat
-from multiprocessing import Pool, cpu_count
+import argparse
 import numpy as np
 import os
 import pandas as pd
-import re
-import spacy
+import sys
 
-from bertopic import BERTopic
-from itunes_app_review_scraper import iTunesScraper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dash_scripts import chart_cube, storage
 
 
+def reviews_name(app_name):
+    return 'data/app_reviews/reviews_{}'.format(app_name.lower())
+
 def combine_data(app_names):        
-    dff = pd.concat(pd.read_csv('data/app_reviews/reviews_{}.csv'.format(app_name.lower()), encoding='utf8') \
-                             for app_name in app_names)
+    dff = pd.concat(storage.read_table(reviews_name(app_name)) for app_name in app_names)
     
     dff = dff.sort_values(['app_name','date'], ascending=[True, False])
     
@@ -32,30 +31,24 @@ def clean_data(df):
     df['sentiment'] = np.select(conditions, values)
     
     # determine day
-    df['day'] = df['date'].apply(lambda x: datetime.strptime(x, '%Y-%m-%d').strftime('%A'))
-    
-    # determine app version levels
-    def versioning(version):
-        ver_lvls = version.split('.')
-        levels = len(ver_lvls)
-        
-        if levels == 1:
-            return ver_lvls[0] + '.0.0.0'
-        elif levels == 2:
-            return ver_lvls[0] + '.' + ver_lvls[1] + '.0.0'
-        elif levels == 3:
-            return version
-        
-    df['version'] = df['version'].apply(versioning)
-    
-    df['version_lvl1'] = df['version'].apply(lambda x: x.split('.')[0])
-    df['version_lvl2'] = df['version'].apply(lambda x: x.split('.')[0] + '.' + x.split('.')[1])
-    df['version_lvl3'] = df['version'].apply(lambda x: x.split('.')[0] + '.' + x.split('.')[1] + '.' + x.split('.')[2])
+    df['day'] = pd.to_datetime(df['date'], format='%Y-%m-%d').dt.day_name()
+    
+    # determine app version levels, padding missing levels with 0 and ignoring levels past the third
+    ver_lvls = df['version'].astype(str).str.split('.', n=3, expand=True)
+    ver_lvls = ver_lvls.reindex(columns=range(3)).fillna('0')
+    
+    df['version_lvl1'] = ver_lvls[0]
+    df['version_lvl2'] = ver_lvls[0] + '.' + ver_lvls[1]
+    df['version_lvl3'] = ver_lvls[0] + '.' + ver_lvls[1] + '.' + ver_lvls[2]
     
     df = df.drop(columns=['version'])
     
+    # key the link words tables refer to reviews by
+    df['review_key'] = storage.review_keys(df)
+    
     # rearrange columns
-    df = df[['title', 'review', 'username',
+    df = df[['review_key',
+             'title', 'review', 'username',
              'app_name', 'app_id', 'country',
              'rating', 'sentiment',
              'date', 'day',
@@ -63,10 +56,42 @@ def clean_data(df):
                                               
     return df.reset_index(drop=True)
 
+def refresh_cube(df, app_names, cube_name):
+    """
+    Counts again the apps whose reviews changed since the cube was saved,
+    as 1_web_scraping.py only rewrites the tables of apps with new or
+    edited reviews, and apps the cube has not counted yet, e.g. newly
+    added to apps.txt. Apps no longer listed are dropped.
+    """
+    if not os.path.exists(storage.table_file(cube_name)):
+        return chart_cube.build_cube(df)
+    
+    saved = os.path.getmtime(storage.table_file(cube_name))
+    cube = storage.read_table(cube_name)
+    counted = set(cube['app_name'])
+    changed = [app_name for app_name in app_names
+               if app_name not in counted or os.path.getmtime(storage.table_file(reviews_name(app_name))) > saved]
+    print('Updating the chart cube of {} of {} apps.'.format(len(changed), len(app_names)))
+    
+    cube = cube[cube['app_name'].isin(app_names)]
+    
+    return chart_cube.recount_apps(cube, df, changed)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rebuild-cube', action='store_true', help='recount the chart cube from every review')
+    args = parser.parse_args()
+    
     with open('apps.txt') as fileIn:
         apps = dict(line.strip().split(',') for line in fileIn)
     
     df = combine_data(apps.keys())
     df = clean_data(df)
-    df.to_csv('data/all_reviews.csv', encoding='utf8', index=False)
\ No newline at end of file
+    
+    if args.rebuild_cube:
+        cube = chart_cube.build_cube(df)
+    else:
+        cube = refresh_cube(df, list(apps.keys()), 'data/chart_cube')
+    
+    storage.write_table(df, 'data/all_reviews')
+    storage.write_table(cube, 'data/chart_cube')
\ No newline at end of file
@@ -1,56 +1,152 @@
-from datetime import datetime
-from itertools import repeat
-from multiprocessing import Pool, cpu_count
-import numpy as np
+import argparse
 import os
 import pandas as pd
-import re
-import spacy
+import sys
+import time
 
-from bertopic import BERTopic
-from itunes_app_review_scraper import iTunesScraper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dash_scripts import storage, topic_colours
+from embedding_cache import EmbeddingCache
 
 
-def calculate_topics(input_file):
-    def get_keywords(id):
-        return '_'.join([topic[0] for topic in model.get_topic(id)][:5])
-                    
+EMBEDDING_MODEL = 'paraphrase-TinyBERT-L6-v2'
+MODEL_PATH = 'data/models/bertopic'
+
+
+def get_keywords(model, id):
+    return '_'.join([topic[0] for topic in model.get_topic(id)][:5])
+
+
+def calculate_topics(input_file, batch_size=64):
     # Get reviews
-    df = pd.read_csv(input_file)
+    df = storage.read_table(input_file)
     corpus = list(df['review'].astype(str))
     
     print('Calculating the topics for {} sentences. This might take a while.'.format(len(corpus)))
-    model = BERTopic(embedding_model='paraphrase-TinyBERT-L6-v2', nr_topics='auto')
-    topics, _ = model.fit_transform(corpus)
+    start = time.perf_counter()
+
+    # imported here, as they take seconds to import and --help does not need them
+    from bertopic import BERTopic
+    from sentence_transformers import SentenceTransformer
+
+    # encode only the reviews that are not in the embedding cache
+    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    cache = EmbeddingCache('data/cache/embeddings', EMBEDDING_MODEL)
+    embeddings = cache.encode(corpus, embedding_model, batch_size=batch_size)
+    encoded = time.perf_counter()
+
+    model = BERTopic(embedding_model=embedding_model, nr_topics='auto')
+    topics, _ = model.fit_transform(corpus, embeddings)
+    fitted = time.perf_counter()
+
+    print('Encoding: {:.1f}s | Topic fitting (UMAP/HDBSCAN): {:.1f}s | Total: {:.1f}s'.format(encoded - start, fitted - encoded, fitted - start))
+    
+    # keep the fitted model so new reviews can be assigned without refitting
+    model.save(MODEL_PATH, save_embedding_model=False)
     
     df['topic_id'] = topics
-    df['topic_keywords'] = [get_keywords(id) for id in df['topic_id']]
+    df['topic_keywords'] = [get_keywords(model, id) for id in df['topic_id']]
     
-    df.to_csv('data/all_reviews_topics.csv', index=False, encoding='utf8')
+    storage.write_table(df, 'data/all_reviews_topics')
     
     return df
 
 
-def summarise_topics(app_name, df):
-    # get dataframe for app_name
-    df = df[df['app_name']==app_name]
+def match_topics(df_topics, df):
+    # (rows of df_topics whose review is still in df, rows of df without a topic yet, number of rows removed);
+    # a review edited or deleted since has a review_key df no longer holds, so only its current copy is counted
+    current = df_topics['review_key'].isin(df['review_key'])
+    df_topics = df_topics[current].reset_index(drop=True)
+    df = df[~df['review_key'].isin(df_topics['review_key'])]
+    return df_topics, df, int((~current).sum())
+
+
+def assign_topics(input_file, output_file, batch_size=64):
+    # reviews of input_file that are not in output_file yet
+    df_topics = storage.read_table(output_file)
+    df = storage.read_table(input_file)
+
+    # a table saved before review keys existed, and the rows appended to it since, whose keys became floats,
+    # gets the key of every row again; the keys only depend on the review, so they match those of input_file
+    updated = 'review_key' not in df_topics.columns or df_topics['review_key'].dtype != 'int64'
+    if updated:
+        print('Adding review keys to {}.'.format(output_file))
+        df_topics = df_topics.drop(columns='review_key', errors='ignore')
+        df_topics.insert(0, 'review_key', storage.review_keys(df_topics))
+
+    if 'review_key' not in df.columns:
+        df.insert(0, 'review_key', storage.review_keys(df))
+
+    df_topics, df, removed = match_topics(df_topics, df)
+    if removed:
+        print('Removing {} sentences of edited or deleted reviews.'.format(removed))
+        updated = True
+
+    print('Assigning topics to {} new sentences with the saved model.'.format(len(df)))
+    if len(df) == 0:
+        if updated:
+            storage.write_table(df_topics, output_file)
+        return df_topics
+
+    corpus = list(df['review'].astype(str))
+
+    from bertopic import BERTopic
+    from sentence_transformers import SentenceTransformer
+
+    embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+    cache = EmbeddingCache('data/cache/embeddings', EMBEDDING_MODEL)
+    embeddings = cache.encode(corpus, embedding_model, batch_size=batch_size)
+
+    model = BERTopic.load(MODEL_PATH, embedding_model=embedding_model)
+    topics, _ = model.transform(corpus, embeddings)
+
+    df['topic_id'] = topics
+    df['topic_keywords'] = [get_keywords(model, id) for id in df['topic_id']]
+
+    df_topics = pd.concat([df_topics, df], ignore_index=True)
+    storage.write_table(df_topics, output_file)
+
+    return df_topics
 
-    # compute count for every topic
-    df = df.groupby(by=['topic_id','topic_keywords']).size()\
-           .sort_values(ascending=False)\
-           .reset_index(name='count')
 
-    filename = 'data/topics/topics_{}.csv'.format(app_name.lower())
-    df.to_csv(filename, index=False, encoding='utf8')
+def summarise_topics(df, app_names):
+    # compute count for every topic of every app in one groupby
+    df = df.groupby(by=['app_name','topic_id','topic_keywords'], observed=True).size()\
+           .reset_index(name='count')\
+           .sort_values(by=['app_name','count'], ascending=[True,False])
+
+    # save one table per app
+    summaries = dict(tuple(df.groupby('app_name', observed=True)))
+    for app_name in app_names:
+        dff = summaries.get(app_name, df.iloc[:0]).drop(columns='app_name')
+
+        storage.write_table(dff, 'data/topics/topics_{}'.format(app_name.lower()))
+
+
+def save_topic_colours(df):
+    # the colour the dashboard shows each topic in, saved next to data/all_reviews_topics
+    storage.write_table(topic_colours.colour_map(df['topic_id']), 'data/topic_colours')
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=64, help='number of reviews per embedding batch')
+    parser.add_argument('--transform-only', action='store_true',
+                        help='assign topics to new reviews with the saved model instead of refitting')
+    args = parser.parse_args()
+
+    if args.transform_only and not (os.path.exists(MODEL_PATH) and os.path.exists('data/all_reviews_topics.parquet')):
+        parser.error('no saved topic model, run a full fit without --transform-only first')
+
     with open('apps.txt') as fileIn:
         apps = dict(line.strip().split(',') for line in fileIn)
 
     os.makedirs('data/topics/', exist_ok=True)
-    df_topics = calculate_topics('data/all_reviews.csv')
-    
-    inputs = zip(apps.keys(), repeat(df_topics))
-    with Pool(cpu_count()) as pool:
-        list(pool.starmap(summarise_topics, inputs))
\ No newline at end of file
+    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
+    if args.transform_only:
+        df_topics = assign_topics('data/all_reviews', 'data/all_reviews_topics', batch_size=args.batch_size)
+    else:
+        df_topics = calculate_topics('data/all_reviews', batch_size=args.batch_size)
+
+    summarise_topics(df_topics, apps.keys())
+    save_topic_colours(df_topics)
\ No newline at end of file
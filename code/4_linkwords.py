@@ -1,25 +1,27 @@
-from datetime import datetime
-from itertools import repeat
-from multiprocessing import Pool, cpu_count
+import argparse
 import numpy as np
 import os
-import pandas as pd
-import re
 import spacy
+import sys
 
-from bertopic import BERTopic
-from itunes_app_review_scraper import iTunesScraper
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dash_scripts import storage
+from linkword_cache import LinkwordCache, cache_version
+from linkword_rules import RuleEngine
 
 
-def summarise_linkwords(app_name, df):
-    # get dataframe for app_name
-    dff = df[df['app_name']==app_name]
-    
-    # compute count and mean for every link word
-    dff = dff.groupby('link_words')['rating']\
-             .agg(['count','mean'])\
-             .sort_values(by=['count','mean'], ascending=[False,False])\
-             .reset_index()
+# components of en_core_web_sm the rules do not read
+UNUSED_PIPES = ['ner']
+
+CACHE_FILE = 'data/cache/linkwords.pkl'
+
+
+def summarise_linkwords(df, app_names):
+    # compute count and mean for every link word of every app in one groupby
+    dff = df.groupby(['app_name','link_words'], observed=True)['rating']\
+            .agg(['count','mean'])\
+            .reset_index()\
+            .sort_values(by=['app_name','count','mean'], ascending=[True,False,False])
     dff = dff.rename(columns={'mean':'rating'})
     dff['rating'] = dff['rating'].round(2)
 
@@ -31,10 +33,16 @@ def summarise_linkwords(app_name, df):
     values = ['Positive', 'Negative', 'Neutral']
     dff['sentiment'] = np.select(conditions, values)
 
-    # save to csv
-    dff.to_csv('data/linkwords/linkwords_summary_{}.csv'.format(app_name.lower()), index=False, encoding='utf8')
+    # save one table per app
+    summaries = dict(tuple(dff.groupby('app_name', observed=True)))
+    for app_name in app_names:
+        summary = summaries.get(app_name, dff.iloc[:0]).drop(columns='app_name')
+        storage.write_table(summary, 'data/linkwords/linkwords_summary_{}'.format(app_name.lower()))
 
 
+# rules 1-5 below walk the doc once each; the pipeline runs the same rules
+# in a single pass through linkword_rules.RuleEngine and keeps these as the reference
+
 # rule 1: verb, noun(object)
 def rule1(doc):
     
@@ -171,39 +179,80 @@ def rule5(doc):
     return link_words
 
 
+rule_engine = RuleEngine()
+
+
+def extract_linkwords(doc):
+    return rule_engine(doc)
+
+
+def parse_reviews(nlp, texts, batch_size=256, n_process=1):
+    # stream the reviews through spacy and yield the link words of each review, in input order
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        yield extract_linkwords(doc)
+
+
+def build_linkwords(df, linkwords):
+    # collect (row, link word) pairs, then expand the reviews once with a single take
+    rows = []
+    words = []
+    for index, overall_lw in enumerate(linkwords):
+        rows.extend([index] * len(overall_lw))
+        words.extend(overall_lw)
+
+    df_link = df.take(rows).reset_index(drop=True)
+    df_link['link_words'] = words
+
+    return df_link
+
+
+def cached_linkwords(nlp, cache, texts, batch_size=256, n_process=1):
+    # parse only the reviews whose text is not in the cache yet
+    keys = [cache.key(text) for text in texts]
+
+    new_reviews = {}
+    for key, text in zip(keys, texts):
+        if key not in cache:
+            new_reviews.setdefault(key, text)
+
+    print('Parsing {} of {} reviews, the rest are cached.'.format(len(new_reviews), len(keys)))
+    linkwords = parse_reviews(nlp, new_reviews.values(), batch_size=batch_size, n_process=n_process)
+    for key, overall_lw in zip(new_reviews.keys(), linkwords):
+        cache[key] = overall_lw
+
+    cache.save(keys)
+
+    return [cache[key] for key in keys]
+
+
 if __name__ == '__main__':
-    nlp = spacy.load('en_core_web_sm')
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch-size', type=int, default=256, help='number of reviews per spacy batch')
+    parser.add_argument('--n-process', type=int, default=1, help='number of spacy worker processes')
+    parser.add_argument('--rebuild', action='store_true', help='ignore the cache and parse every review')
+    args = parser.parse_args()
+
+    nlp = spacy.load('en_core_web_sm', disable=UNUSED_PIPES)
     os.makedirs('data/linkwords/', exist_ok=True)
     
     with open('apps.txt') as fileIn:
         apps = dict(line.strip().split(',') for line in fileIn)
 
-    df = pd.read_csv('data/all_reviews.csv', encoding='utf8')
+    df = storage.read_table('data/all_reviews')
+    if 'review_key' not in df.columns:
+        parser.error('data/all_reviews has no review_key column, run code/2_data_cleaning.py again')
     
-    df_link = pd.DataFrame()
-
-    for index, row in enumerate(df['review']):
-        doc = nlp(row)
-        
-        r1 = rule1(doc)
-        r2 = rule2(doc)
-        r3 = rule3(doc)
-        r4 = rule4(doc)
-        r5 = rule5(doc)
-        
-        overall_lw = r1 + r2 + r3 + r4 + r5
-        
-        df_row = df.iloc[index].to_frame().T
-        df_row_replicated = pd.DataFrame(np.repeat(df_row.values, len(overall_lw), axis=0), columns=df.columns)
-        df_row_replicated['link_words'] = overall_lw
-        df_link = pd.concat([df_link, df_row_replicated])
+    cache = LinkwordCache(CACHE_FILE, cache_version(nlp, rule_engine))
+    if args.rebuild:
+        cache.clear()
 
-    df_link['rating'] = df_link['rating'].astype(str).astype(int)
+    linkwords = cached_linkwords(nlp, cache, df['review'].tolist(), batch_size=args.batch_size, n_process=args.n_process)
+    df_link = build_linkwords(df, linkwords)
     
+    # the link words tables refer to their reviews by key instead of repeating them for every link word
+    app_links = dict(tuple(df_link.groupby('app_name', observed=True)))
     for app_name in apps.keys():
-        dff = df_link[df_link['app_name']==app_name].reset_index(drop=True)
-        dff.to_csv('data/linkwords/linkwords_{}.csv'.format(app_name.lower()), index=False, encoding='utf8')
+        dff = app_links.get(app_name, df_link.iloc[:0])[['review_key', 'link_words']]
+        storage.write_table(dff, 'data/linkwords/linkwords_{}'.format(app_name.lower()))
 
-    inputs = zip(apps.keys(), repeat(df_link))
-    with Pool(cpu_count()) as pool:
-        result = list(pool.starmap(summarise_linkwords, inputs))
\ No newline at end of file
+    summarise_linkwords(df_link, apps.keys())
\ No newline at end of file
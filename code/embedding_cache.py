@@ -0,0 +1,70 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Sentence embeddings of reviews stored on disk, keyed by a hash of the
+    review text. The vectors live in one .npy matrix that is memory-mapped
+    on load, with a pickled index from text hash to matrix row next to it.
+    """
+
+    def __init__(self, folder, model_name):
+        name = model_name.replace('/', '_')
+        self.matrix_file = os.path.join(folder, '{}.npy'.format(name))
+        self.index_file = os.path.join(folder, '{}_index.pkl'.format(name))
+        self.matrix = None
+        self.index = {}
+
+        if os.path.exists(self.matrix_file) and os.path.exists(self.index_file):
+            self.matrix = np.load(self.matrix_file, mmap_mode='r')
+            with open(self.index_file, 'rb') as fileIn:
+                index = pickle.load(fileIn)
+
+            # rows past the end of the matrix belong to an interrupted write
+            self.index = {key: row for key, row in index.items() if row < len(self.matrix)}
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha1(text.encode('utf8')).hexdigest()
+
+    def encode(self, texts, model, batch_size=64):
+        keys = [self.key(text) for text in texts]
+
+        new_texts = {}
+        for key, text in zip(keys, texts):
+            if key not in self.index:
+                new_texts.setdefault(key, text)
+
+        print('Encoding {} of {} reviews, the rest are cached.'.format(len(new_texts), len(keys)))
+        if new_texts:
+            vectors = model.encode(list(new_texts.values()), batch_size=batch_size,
+                                   show_progress_bar=True, convert_to_numpy=True)
+            self.append(list(new_texts.keys()), vectors)
+
+        return np.asarray(self.matrix[[self.index[key] for key in keys]])
+
+    def append(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype='float32')
+        n = len(self.index)
+
+        os.makedirs(os.path.dirname(self.matrix_file) or '.', exist_ok=True)
+        tmp_file = self.matrix_file + '.tmp.npy'
+        matrix = np.lib.format.open_memmap(tmp_file, mode='w+', dtype='float32',
+                                           shape=(n + len(vectors), vectors.shape[1]))
+        if n:
+            matrix[:n] = self.matrix[:n]
+        matrix[n:] = vectors
+        matrix.flush()
+        del matrix
+        os.replace(tmp_file, self.matrix_file)
+
+        self.index.update((key, n + i) for i, key in enumerate(keys))
+        with open(self.index_file + '.tmp', 'wb') as fileOut:
+            pickle.dump(self.index, fileOut, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.index_file + '.tmp', self.index_file)
+
+        self.matrix = np.load(self.matrix_file, mmap_mode='r')
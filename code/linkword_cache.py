@@ -0,0 +1,55 @@
+import hashlib
+import os
+import pickle
+
+import spacy
+
+
+def cache_version(nlp, rule_engine):
+    # everything that can change the link words extracted from the same text
+    return '|'.join([spacy.__version__,
+                     nlp.meta['name'], nlp.meta['version'],
+                     ','.join(nlp.pipe_names),
+                     rule_engine.signature()])
+
+
+class LinkwordCache:
+    """
+    Link words extracted per review, keyed on a hash of the review text and
+    the cache version. Entries from another spaCy model or rule set never
+    match, and are dropped on the next save.
+    """
+
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        self.entries = {}
+
+        if os.path.exists(path):
+            with open(path, 'rb') as fileIn:
+                self.entries = pickle.load(fileIn)
+
+    def key(self, text):
+        return hashlib.sha1((self.version + '\0' + text).encode('utf8')).hexdigest()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def __setitem__(self, key, link_words):
+        self.entries[key] = link_words
+
+    def clear(self):
+        self.entries = {}
+
+    def save(self, keys):
+        # only keep the entries of the current corpus
+        entries = {key: self.entries[key] for key in keys}
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as fileOut:
+            pickle.dump(entries, fileOut, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,180 @@
+import hashlib
+import inspect
+import sys
+
+import numpy as np
+
+from spacy.attrs import DEP, HEAD, LEMMA, ORTH, POS
+from spacy.strings import StringStore
+from spacy.symbols import ADJ, ADP, NOUN, PROPN, VERB
+
+
+def label_ids(*labels):
+    # dependency labels are compared by id, the same way spacy stores them on tokens
+    strings = StringStore()
+    return frozenset(strings.add(label) for label in labels)
+
+
+NOUNS = frozenset([NOUN, PROPN])
+SUBJECTS = label_ids('nsubj', 'nsubjpass')
+OBJECTS = label_ids('dobj')
+NOUN_ARGS = label_ids('dobj', 'pobj', 'nsubj', 'nsubjpass')
+COMPOUND = label_ids('compound')
+
+
+class ParsedDoc:
+    # integer view of a parsed doc, exported once with to_array and shared by every rule
+    def __init__(self, doc):
+        array = doc.to_array([POS, DEP, HEAD, ORTH, LEMMA])
+        n = len(array)
+
+        self.strings = doc.vocab.strings
+        self.pos = array[:, 0].tolist()
+        self.dep = array[:, 1].tolist()
+        self.orth = array[:, 3].tolist()
+        self.lemmas = array[:, 4].tolist()
+
+        # HEAD is exported as an offset to the head token
+        self.head = (np.arange(n) + array[:, 2].astype('int64')).tolist()
+
+        # children in document order, split around the token like token.lefts / token.rights
+        self.lefts = [[] for _ in range(n)]
+        self.rights = [[] for _ in range(n)]
+        for child, head in enumerate(self.head):
+            if child < head:
+                self.lefts[head].append(child)
+            elif child > head:
+                self.rights[head].append(child)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def text(self, i):
+        return self.strings[self.orth[i]]
+
+    def lemma(self, i):
+        return self.strings[self.lemmas[i]]
+
+
+# rule 1: verb, noun(object)
+def verb_object(doc, i):
+    link_words = []
+    phrase = ''
+
+    for right in doc.rights[i]:
+        if (doc.dep[right] in OBJECTS) and (doc.pos[right] in NOUNS):
+            # the phrase keeps growing for every object, as in rule1
+            phrase += doc.text(i) + ' ' + doc.text(right)
+            link_words.append(phrase)
+
+    return link_words
+
+
+# rule 2: noun(subject), verb
+def subject_verb(doc, i):
+    link_words = []
+    phrase = ''
+
+    for left in doc.lefts[i]:
+        if (doc.dep[left] in SUBJECTS) and (doc.pos[left] in NOUNS):
+            phrase += doc.text(left) + ' ' + doc.lemma(i)
+            link_words.append(phrase)
+
+    return link_words
+
+
+# rule 3: noun(subject), verb, noun(object)
+def subject_verb_object(doc, i):
+    link_words = []
+    phrase = ''
+
+    for left in doc.lefts[i]:
+        if (doc.dep[left] in SUBJECTS) and (doc.pos[left] in NOUNS):
+            phrase += doc.text(left) + ' ' + doc.lemma(i)
+
+            for right in doc.rights[i]:
+                if (doc.dep[right] in OBJECTS) and (doc.pos[right] in NOUNS):
+                    phrase += ' ' + doc.text(right)
+                    link_words.append(phrase)
+
+    return link_words
+
+
+# rule 4: noun(subject), Adj
+def adjective_noun(doc, i):
+    if doc.dep[i] not in NOUN_ARGS:
+        return []
+
+    phrase = ''
+    for child in doc.lefts[i] + doc.rights[i]:
+        if (doc.pos[child] == ADJ) or (doc.dep[child] in COMPOUND):
+            phrase += doc.text(child) + ' '
+
+    if len(phrase) == 0:
+        return []
+
+    return [phrase + doc.text(i)]
+
+
+# rule 5: noun(subject), Noun
+def noun_preposition_noun(doc, i):
+    head = doc.head[i]
+    if doc.pos[head] != NOUN:
+        return []
+
+    phrase = doc.text(head) + ' ' + doc.text(i)
+    for right in doc.rights[i]:
+        if doc.pos[right] in NOUNS:
+            phrase += ' ' + doc.text(right)
+
+    if len(phrase) <= 2:
+        return []
+
+    return [phrase]
+
+
+# (pos of the token that triggers the rule, rule), in output order
+DEFAULT_RULES = [
+    (VERB, verb_object),
+    (VERB, subject_verb),
+    (VERB, subject_verb_object),
+    (NOUN, adjective_noun),
+    (ADP, noun_preposition_noun),
+]
+
+
+class RuleEngine:
+    """
+    Runs every link-word rule in a single pass over the tokens of a doc.
+
+    A rule is a function (doc, i) -> list of phrases, called only for tokens
+    whose part-of-speech id matches the one it is registered with. The output
+    lists the phrases of each rule in turn, in the order the rules were added.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = []
+        self.triggers = {}
+        for pos, rule in rules:
+            self.add_rule(pos, rule)
+
+    def add_rule(self, pos, rule):
+        self.triggers.setdefault(pos, []).append((len(self.rules), rule))
+        self.rules.append((pos, rule))
+
+    def signature(self):
+        # changes whenever this module or any registered rule is edited
+        source = [inspect.getsource(sys.modules[__name__])]
+        source += ['{}:{}'.format(pos, inspect.getsource(rule)) for pos, rule in self.rules]
+
+        return hashlib.sha1('\n'.join(source).encode('utf8')).hexdigest()
+
+    def __call__(self, doc):
+        parsed = ParsedDoc(doc)
+        link_words = [[] for _ in self.rules]
+
+        for i, pos in enumerate(parsed.pos):
+            for index, rule in self.triggers.get(pos, ()):
+                link_words[index].extend(rule(parsed, i))
+
+        return [phrase for phrases in link_words for phrase in phrases]
@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import requests
+
+
+FEED_URL = 'https://itunes.apple.com/{country}/rss/customerreviews/page={page}/id={app_id}/sortby=mostrecent/json'
+
+# the feed serves at most 10 pages of 50 reviews
+MAX_PAGES = 10
+
+
+class RateLimiter:
+    # spaces out requests to the same host by at least 1/rate seconds
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def parse_entries(feed):
+    entries = feed.get('feed', {}).get('entry', [])
+    if isinstance(entries, dict):
+        entries = [entries]
+
+    reviews = []
+    for entry in entries:
+        # the first entry of a page can describe the app itself
+        if 'im:rating' not in entry:
+            continue
+
+        reviews.append({
+            'review_id': entry['id']['label'],
+            'title': entry['title']['label'],
+            'stars': int(entry['im:rating']['label']),
+            'text': entry['content']['label'],
+            'username': entry['author']['name']['label'],
+            'version': entry['im:version']['label'],
+            'date': entry['updated']['label'][:10],
+        })
+
+    return reviews
+
+
+class ReviewFetcher:
+    """
+    Fetches review pages of many (app, country) pairs concurrently, paging
+    through each pair in order so paging can stop at already-seen reviews.
+
+    Requests go through a bounded thread pool, one keep-alive session per
+    thread, and a per-host rate limit. Failed requests are retried with
+    exponential backoff. Every page is written to page_folder as soon as it
+    arrives.
+    """
+
+    def __init__(self, page_folder, feed_url=FEED_URL, max_workers=8, rate=5.0,
+                 retries=4, backoff=1.0, timeout=10):
+        self.page_folder = page_folder
+        self.feed_url = feed_url
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def get_json(self, url):
+        host = urlparse(url).netloc
+
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(host)
+            try:
+                response = self.session().get(url, timeout=self.timeout)
+                response.raise_for_status()
+                return response.json()
+            except (requests.RequestException, ValueError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def page_file(self, app_id, country, page):
+        return os.path.join(self.page_folder, '{}_{}_{}.json'.format(app_id, country.lower(), page))
+
+    def fetch_page(self, app_id, country, page):
+        url = self.feed_url.format(app_id=app_id, country=country.lower(), page=page)
+        reviews = parse_entries(self.get_json(url))
+
+        filename = self.page_file(app_id, country, page)
+        with open(filename + '.tmp', 'w', encoding='utf8') as fileOut:
+            json.dump(reviews, fileOut)
+        os.replace(filename + '.tmp', filename)
+
+        return reviews
+
+    def fetch_pages(self, app_id, country, pages=MAX_PAGES, stop=None):
+        # pages are requested in order until one is empty or stop(app_id, country, reviews) is true
+        fetched = []
+        for page in range(1, pages + 1):
+            reviews = self.fetch_page(app_id, country, page)
+            fetched.append((page, reviews))
+
+            if not reviews or (stop is not None and stop(app_id, country, reviews)):
+                break
+
+        return fetched
+
+    def fetch(self, app_ids, countries, pages=MAX_PAGES, stop=None):
+        # yields (app_id, country, page, reviews), one (app_id, country) at a time in completion order
+        os.makedirs(self.page_folder, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.fetch_pages, app_id, country, pages, stop): (app_id, country)
+                       for app_id in app_ids
+                       for country in countries}
+
+            for future in as_completed(futures):
+                app_id, country = futures[future]
+                try:
+                    fetched = future.result()
+                except (requests.RequestException, ValueError) as error:
+                    print('Failed to fetch app {} ({}): {}'.format(app_id, country, error))
+                    continue
+
+                for page, reviews in fetched:
+                    yield app_id, country, page, reviews
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from dash_scripts import storage
+
+##############################################################################
+
+# the columns the Analysis tab charts group reviews by
+CUBE_DIMENSIONS = ['app_name', 'rating', 'sentiment', 'day',
+                   'version_lvl1', 'version_lvl2', 'version_lvl3']
+
+CUBE_COLUMNS = CUBE_DIMENSIONS + ['count', 'rating_sum']
+
+
+def build_cube(df):
+	# number of reviews and sum of their ratings for every observed combination of dimensions
+	df = storage.set_dtypes(df[CUBE_DIMENSIONS].assign(count=1, rating_sum=df['rating'].astype('int64')))
+	return df.groupby(CUBE_DIMENSIONS, observed=True)[['count', 'rating_sum']].sum().reset_index()
+
+
+def recount_apps(cube, df, app_names):
+	# counts the reviews of app_names in df again and keeps the rows of every other app
+	kept = cube[~cube['app_name'].isin(app_names)]
+	counted = build_cube(df[df['app_name'].isin(app_names)])
+
+	return storage.set_dtypes(pd.concat([kept, counted], ignore_index=True))
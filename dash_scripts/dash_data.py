@@ -0,0 +1,479 @@
+import json
+import logging
+import math
+import os
+from collections import OrderedDict
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from dash_scripts import chart_cube, dash_filter, storage, topic_colours
+
+##############################################################################
+
+logger = logging.getLogger(__name__)
+
+REVIEW_COLUMNS = ['title','review','username',
+                  'app_name','country',
+                  'rating','sentiment',
+                  'date','day',
+                  'version_lvl1','version_lvl2','version_lvl3',
+                  'topic_id', 'topic_keywords']
+
+LINKWORD_SUMMARY_COLUMNS = ['link_words','count','rating','sentiment']
+
+LINKWORD_COLUMNS = ['title','review','username','app_name',
+                    'country','rating','sentiment',
+                    'date','day',
+                    'version_lvl1','version_lvl2','version_lvl3',
+                    'link_words']
+
+TOPIC_COLUMNS = ['topic_id','topic_keywords','count']
+
+# free-text columns whose contains filters go through a word index
+INDEXED_COLUMNS = ['title','review','link_words']
+
+
+def with_index(df, columns):
+	df = df.copy()
+	df['index'] = range(1, len(df) + 1)
+	return df[['index'] + columns]
+
+
+def load_reviews(name):
+	# reviews are indexed by review_key, when the pipeline saved one, for the link words tables to refer to
+	keyed = 'review_key' in storage.table_columns(name)
+	reviews = storage.read_table(name, columns=REVIEW_COLUMNS + ['review_key'] * keyed)
+	if keyed:
+		reviews = reviews.set_index('review_key')
+	
+	# dates and topic keywords repeat across reviews
+	reviews['date'] = reviews['date'].astype(str).astype('category')
+	reviews['topic_keywords'] = reviews['topic_keywords'].astype('category')
+	reviews['version_lvl1'] = reviews['version_lvl1'].astype(str).astype(int)
+	return with_index(reviews, REVIEW_COLUMNS)
+
+
+def load_linkword_summary(name):
+	return with_index(storage.read_table(name, columns=LINKWORD_SUMMARY_COLUMNS), LINKWORD_SUMMARY_COLUMNS)
+
+
+def load_linkwords(name):
+	# (review_key, link_words) pairs; tables saved before the pipeline kept review keys repeat the review columns
+	if 'review_key' not in storage.table_columns(name):
+		return with_index(storage.read_table(name, columns=LINKWORD_COLUMNS), LINKWORD_COLUMNS)
+	
+	links = storage.read_table(name, columns=['review_key', 'link_words'])
+	links['link_words'] = links['link_words'].astype('category')
+	return links
+
+
+def join_reviews(links, reviews):
+	"""
+	Table of (review_key, link_words) pairs whose other columns are read
+	from the reviews Table, one displayed page at a time. Link words of
+	reviews missing from it, e.g. not given a topic yet, are left out
+	with a warning.
+	"""
+	if reviews.df.index.name == 'review_key':
+		positions = pd.Series(np.arange(len(reviews), dtype='int32'), index=reviews.df.index)
+		positions = positions[~positions.index.duplicated()].reindex(links['review_key']).to_numpy()
+	else:
+		# reviews saved without keys have nothing to join on
+		positions = np.full(len(links), np.nan)
+	found = ~np.isnan(positions)
+	
+	if not found.all():
+		logger.warning('%d of %d link words refer to reviews missing from all_reviews_topics and are not shown; '
+		               'run code/3_topic_modelling.py again to give every review a topic and a review_key',
+		               (~found).sum(), len(found))
+	
+	links = with_index(links[found], ['link_words'])
+	return Table(links, parent=reviews, parent_rows=positions[found].astype('int32'), columns=['index'] + LINKWORD_COLUMNS)
+
+
+def load_topics(name):
+	# the first row holds the outlier topic
+	return with_index(storage.read_table(name, columns=TOPIC_COLUMNS).iloc[1:], TOPIC_COLUMNS)
+
+
+def load_cube(name):
+	cube = storage.read_table(name, columns=chart_cube.CUBE_COLUMNS)
+	cube['version_lvl1'] = cube['version_lvl1'].astype(str).astype(int)
+	return cube
+
+
+class LRUCache:
+	# mapping that evicts the least recently used entries once the total weight
+	# of its values exceeds maxsize; every value weighs 1 unless weigh is given
+	def __init__(self, maxsize, weigh=None):
+		self.maxsize = maxsize
+		self.weigh = weigh or (lambda value: 1)
+		self.lock = threading.Lock()
+		self.entries = OrderedDict()
+		self.size = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def keys(self):
+		with self.lock:
+			return list(self.entries)
+
+	def get(self, key, default=None):
+		with self.lock:
+			if key not in self.entries:
+				return default
+			self.entries.move_to_end(key)
+			return self.entries[key][0]
+
+	def put(self, key, value):
+		weight = self.weigh(value)
+		with self.lock:
+			if key in self.entries:
+				self.size -= self.entries.pop(key)[1]
+			self.entries[key] = (value, weight)
+			self.size += weight
+			
+			# always keep the newest entry, even if it alone is over the limit
+			while self.size > self.maxsize and len(self.entries) > 1:
+				_, (_, evicted) = self.entries.popitem(last=False)
+				self.size -= evicted
+
+
+class Table:
+	"""
+	A loaded frame plus the structures used to query it: the compiled plan
+	of each recent filter_query, the lowercased shadow columns text
+	clauses match against, a word index of each indexed column and the
+	ranks and presorted order of each column sorted on. All are built on
+	first use and live as long as the table, so a frame is never
+	lowercased, indexed, sorted or parsed twice.
+
+	A table can also take some of its columns from a parent table, with
+	parent_rows the position in the parent of each of its rows. Those
+	columns are filtered and sorted through the parent's structures and
+	only copied out for the rows of a page.
+
+	The matching rows of recent clauses are kept up to max_result_bytes.
+	A clause that narrows a kept one, like each keystroke typed into a
+	filter box, is only checked against the rows of that clause, as long
+	as they are under max_refine_share of the table; copying out most of
+	a column costs more than scanning it.
+	"""
+
+	def __init__(self, df, parent=None, parent_rows=None, columns=None,
+	             max_plans=128, max_result_bytes=64 * 2**20, max_refine_share=0.25, indexed=INDEXED_COLUMNS):
+		self.df = df
+		self.parent = parent
+		self.parent_rows = parent_rows
+		self.columns = columns or list(df.columns)
+		self.parent_columns = [col for col in self.columns if col not in df.columns]
+		self.max_refine_rows = max_refine_share * len(df)
+		self.plans = LRUCache(max_plans)
+		self.results = LRUCache(max_result_bytes, weigh=lambda rows: rows.nbytes)
+		self.shadows = {}
+		self.indexed = [col for col in indexed if col in df.columns]
+		self.indexes = {}
+		self.ranks = {}
+		self.orders = {}
+
+	def __len__(self):
+		return len(self.df)
+
+	def shadow(self, column):
+		shadow = self.shadows.get(column)
+		if shadow is None:
+			shadow = dash_filter.lower_strings(self.df[column])
+			self.shadows[column] = shadow
+		return shadow
+
+	def text_index(self, column):
+		# categorical columns are already matched once per category, without an index
+		if column not in self.indexed or self.shadow(column)[1] is not None:
+			return None
+		
+		index = self.indexes.get(column)
+		if index is None:
+			index = dash_filter.TextIndex(self.shadow(column)[0])
+			self.indexes[column] = index
+		return index
+
+	def clause_rows(self, key, predicate):
+		rows = self.results.get(key)
+		if rows is not None:
+			return rows
+		
+		# the smallest kept result the clause narrows, if any
+		bases = [self.results.get(base) for base in self.results.keys() if dash_filter.refines(key, base)]
+		base = min((rows for rows in bases if rows is not None), key=len, default=None)
+		
+		if base is None or len(base) > self.max_refine_rows:
+			rows = np.flatnonzero(predicate(self)).astype('int32')
+		else:
+			rows = base[predicate(self, base)]
+		
+		self.results.put(key, rows)
+		return rows
+
+	def parent_clause_rows(self, key, predicate):
+		# rows whose parent row matches a clause on a parent column
+		rows = self.results.get(('parent', key))
+		if rows is None:
+			matched = np.zeros(len(self.parent), dtype=bool)
+			matched[self.parent.clause_rows(key, predicate)] = True
+			rows = np.flatnonzero(matched[self.parent_rows]).astype('int32')
+			self.results.put(('parent', key), rows)
+		return rows
+
+	def rows(self, filter):
+		# sorted positions of the rows matching a filter_query, None when it filters nothing
+		plan = self.plans.get(filter)
+		if plan is None:
+			plan = [(False, clause) for clause in dash_filter.compile_filter(filter, self.df)]
+			if self.parent is not None:
+				plan += [(True, clause) for clause in dash_filter.compile_filter(filter, self.parent.df, self.parent_columns)]
+			self.plans.put(filter, plan)
+		
+		rows = None
+		for on_parent, (key, predicate) in plan:
+			found = self.parent_clause_rows(key, predicate) if on_parent else self.clause_rows(key, predicate)
+			rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+		
+		return rows
+
+	def rank(self, column, ascending):
+		# dense rank of every row's value in sort order, missing values ranked last as in sort_values
+		rank = self.ranks.get((column, ascending))
+		if rank is None and column in self.parent_columns:
+			rank = self.parent.rank(column, ascending)[self.parent_rows]
+			self.ranks[(column, ascending)] = rank
+		elif rank is None:
+			codes, uniques = pd.factorize(self.df[column], sort=True)
+			if not ascending:
+				codes = np.where(codes < 0, codes, len(uniques) - 1 - codes)
+			rank = np.where(codes < 0, len(uniques), codes).astype('int32')
+			self.ranks[(column, ascending)] = rank
+		return rank
+
+	def order(self, column, ascending):
+		# positions of all rows sorted by one column, ties in table order
+		order = self.orders.get((column, ascending))
+		if order is None:
+			order = np.argsort(self.rank(column, ascending), kind='stable').astype('int32')
+			self.orders[(column, ascending)] = order
+		return order
+
+	def sorted_rows(self, filter, keys, end):
+		"""
+		Positions of the rows matching filter, sorted by keys, a list of
+		(column, ascending). Only the first end positions are guaranteed to
+		be in order when sorting by several columns.
+		"""
+		rows = self.rows(filter)
+		
+		if len(keys) == 1:
+			# the presorted order restricted to the matching rows, kept for the next page
+			order = self.results.get(('order', filter, tuple(keys)))
+			if order is None:
+				order = self.order(*keys[0])
+				if rows is not None:
+					matched = np.zeros(len(self.df), dtype=bool)
+					matched[rows] = True
+					order = order[matched[order]]
+				self.results.put(('order', filter, tuple(keys)), order)
+			return order
+		
+		if rows is None:
+			rows = np.arange(len(self.df), dtype='int32')
+		ranks = [self.rank(column, ascending)[rows] for column, ascending in keys]
+		sizes = [int(rank.max(initial=0)) + 1 for rank in ranks]
+		
+		if math.prod(sizes) * len(self.df) >= 2**63:
+			return rows[np.lexsort([rows] + ranks[::-1])]
+		
+		# one int64 key per row, the position breaking ties so the order is the stable one
+		composite = np.zeros(len(rows), dtype='int64')
+		for rank, size in zip(ranks, sizes):
+			composite = composite * size + rank
+		composite = composite * len(self.df) + rows
+		
+		if end < len(rows):
+			# partial selection of the first end rows instead of a full sort
+			order = np.argpartition(composite, end - 1)
+			order[:end] = order[:end][np.argsort(composite[order[:end]])]
+			return rows[order]
+		return rows[np.argsort(composite)]
+
+	def page(self, filter, sort_by, page, size):
+		# rows page*size to (page+1)*size of the filtered and sorted table, and the number of matching rows
+		start, end = page * size, (page + 1) * size
+		keys = [(col['column_id'], col['direction'] == 'asc') for col in sort_by if col['column_id'] in self.columns]
+		
+		if keys:
+			rows = self.sorted_rows(filter, keys, end)
+		else:
+			rows = self.rows(filter)
+			if rows is None:
+				return self.frame(slice(start, end)), len(self)
+		
+		return self.frame(rows[start:end]), len(rows)
+
+	def frame(self, rows):
+		# the rows at the given positions with every column, parent columns joined in
+		df = self.df.iloc[rows]
+		if self.parent is None:
+			return df
+		
+		parent = self.parent.df[self.parent_columns].iloc[self.parent_rows[rows]]
+		df = pd.concat([df.reset_index(drop=True), parent.reset_index(drop=True)], axis=1)
+		return df[self.columns]
+
+	def filter(self, filter):
+		rows = self.rows(filter)
+		if rows is None:
+			return self.df if self.parent is None else self.frame(np.arange(len(self)))
+		return self.frame(rows)
+
+
+class FigureCache:
+	"""
+	Figures kept as plain JSON data, keyed on (app, chart, data version)
+	and bounded by their serialized size. Each figure is built with plotly
+	and serialized once; callbacks then hand Dash data that is cheap to
+	send again.
+	
+	The seconds spent building and serializing are added up separately in
+	totals, and in the timings dict passed to get.
+	"""
+
+	def __init__(self, max_bytes=32 * 2**20):
+		self.figures = LRUCache(max_bytes, weigh=lambda entry: entry[0])
+		self.lock = threading.Lock()
+		self.totals = {'build': 0.0, 'serialize': 0.0, 'hits': 0, 'misses': 0}
+
+	def get(self, key, build, timings=None):
+		entry = self.figures.get(key)
+		if entry is not None:
+			with self.lock:
+				self.totals['hits'] += 1
+			return entry[1]
+		
+		start = time.perf_counter()
+		fig = build()
+		built = time.perf_counter()
+		text = fig.to_json()
+		serialized = time.perf_counter()
+		
+		entry = (len(text), json.loads(text))
+		self.figures.put(key, entry)
+		
+		with self.lock:
+			self.totals['misses'] += 1
+			self.totals['build'] += built - start
+			self.totals['serialize'] += serialized - built
+		
+		if timings is not None:
+			timings['build'] = timings.get('build', 0.0) + built - start
+			timings['serialize'] = timings.get('serialize', 0.0) + serialized - built
+		
+		return entry[1]
+
+
+class DataStore:
+	"""
+	Dashboard datasets, loaded and typed once and reloaded only when their
+	file changes on disk. Files are checked at most every check_interval
+	seconds.
+
+	Frames are shared by every callback and must not be modified in place;
+	a reload builds new frames and swaps them in. At most max_tables frames
+	and max_values derived values, e.g. the query structures of a table,
+	are kept.
+	"""
+
+	def __init__(self, folder='data', check_interval=5, max_tables=32, max_values=64):
+		self.folder = folder
+		self.check_interval = check_interval
+		self.lock = threading.Lock()
+		self.tables = LRUCache(max_tables)
+		self.checked = {}
+		self.values = LRUCache(max_values)
+
+	def load(self, name, loader):
+		# (modification time of the file, frame) of a table
+		name = os.path.join(self.folder, name)
+		entry = self.tables.get(name)
+		
+		now = time.monotonic()
+		if entry is not None and now - self.checked.get(name, 0) < self.check_interval:
+			return entry
+		
+		mtime = os.path.getmtime(storage.table_file(name))
+		self.checked[name] = now
+		if entry is not None and entry[0] == mtime:
+			return entry
+		
+		with self.lock:
+			entry = self.tables.get(name)
+			if entry is None or entry[0] != mtime:
+				entry = (mtime, loader(name))
+				self.tables.put(name, entry)
+		
+		return entry
+
+	def get(self, name, loader):
+		return self.load(name, loader)[1]
+
+	def derived(self, key, base, fn):
+		# value computed from a loaded frame, or a tuple of them, recomputed when any of them is reloaded
+		bases = base if isinstance(base, tuple) else (base,)
+		entry = self.values.get(key)
+		if entry is None or any(old is not new for old, new in zip(entry[0], bases)):
+			entry = (bases, fn(*bases))
+			self.values.put(key, entry)
+		
+		return entry[1]
+
+	def table(self, df):
+		# query structures of a loaded frame, shared until the frame is reloaded
+		return self.derived(('table', id(df)), df, Table)
+
+	def reviews(self):
+		return self.get('all_reviews_topics', load_reviews)
+
+	def cube(self):
+		"""
+		(version, cube) of the counts behind the Analysis tab charts, counted
+		from the reviews when the pipeline saved none. The version changes
+		whenever the data the cube comes from is reloaded.
+		"""
+		if os.path.exists(storage.table_file(os.path.join(self.folder, 'chart_cube'))):
+			mtime, cube = self.load('chart_cube', load_cube)
+			return 'chart_cube@{}'.format(mtime), cube
+		
+		mtime, reviews = self.load('all_reviews_topics', load_reviews)
+		return 'all_reviews_topics@{}'.format(mtime), self.derived('cube', reviews, chart_cube.build_cube)
+
+	def topic_colours(self):
+		# (topic_id, r, g, b) saved by the topic modelling, or computed from the reviews for data saved before it
+		if os.path.exists(storage.table_file(os.path.join(self.folder, 'topic_colours'))):
+			return self.get('topic_colours', storage.read_table)
+		return self.derived('topic_colours', self.reviews(), lambda reviews: topic_colours.colour_map(reviews['topic_id']))
+
+	def linkword_summary(self, app_name):
+		return self.get('linkwords/linkwords_summary_{}'.format(app_name.lower()), load_linkword_summary)
+
+	def linkwords(self, app_name):
+		# Table of the link words of an app, joined to their reviews when the pipeline saved review keys
+		links = self.get('linkwords/linkwords_{}'.format(app_name.lower()), load_linkwords)
+		if 'review_key' not in links.columns:
+			return self.table(links)
+		
+		return self.derived(('linkwords', app_name), (links, self.reviews()),
+		                    lambda links, reviews: join_reviews(links, self.table(reviews)))
+
+	def topics(self, app_name):
+		return self.get('topics/topics_{}'.format(app_name.lower()), load_topics)
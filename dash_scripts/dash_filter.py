@@ -0,0 +1,215 @@
+import re
+from functools import lru_cache
+from operator import eq, ge, gt, le, lt, ne
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from dash_scripts.dash_style import operators
+
+##############################################################################
+
+# every spelling of an operator mapped to its name, e.g. '>=' -> 'ge'
+OPERATOR_NAMES = {op.strip(): names[0].strip() for names in operators for op in names}
+
+# one clause of a DataTable filter_query, e.g. {rating} >= 4 or {review} contains "not working"
+CLAUSE = re.compile(r'\s*\{(?P<column>[^}]*)\}\s*(?P<operator>' +
+                    '|'.join(re.escape(op) + (r'(?=\s)' if op[-1].isalpha() else '')
+                             for op in sorted(OPERATOR_NAMES, key=len, reverse=True)) +
+                    r')\s*(?P<value>.*?)\s*$', re.S)
+
+NUMBER_COMPARE = {'ge': ge, 'le': le, 'lt': lt, 'gt': gt, 'ne': ne, 'eq': eq}
+
+TEXT_COMPARE = {'ge': pc.greater_equal, 'le': pc.less_equal, 'lt': pc.less,
+                'gt': pc.greater, 'ne': pc.not_equal, 'eq': pc.equal}
+
+# words of the text index are the runs of letters and digits; everything else separates them
+NON_WORD = r'[^\p{L}\p{N}\s]+'
+
+
+def parse_value(value):
+	# DataTable quotes values with spaces or operators in them
+	if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+		value = value[1:-1].replace('\\' + value[0], value[0])
+	return value
+
+
+def as_number(value):
+	try:
+		return float(value)
+	except ValueError:
+		return None
+
+
+@lru_cache(maxsize=1024)
+def parse_filter(query):
+	# filter_query -> ((column, operator name, value), ...); clauses that don't parse are ignored
+	clauses = []
+	for part in (query or '').split(' && '):
+		match = CLAUSE.match(part)
+		if match is not None and match['value']:
+			clauses.append((match['column'], OPERATOR_NAMES[match['operator'].strip()], parse_value(match['value'])))
+
+	return tuple(clauses)
+
+
+def lower_strings(series):
+	"""
+	Lowercased text of a column as an arrow array, the shadow column text
+	clauses are matched against. A categorical column is lowercased once
+	per category and also returns its codes to expand a match to rows.
+	"""
+	codes = None
+	if isinstance(series.dtype, pd.CategoricalDtype):
+		codes = series.cat.codes.to_numpy()
+		series = series.cat.categories.to_series()
+
+	if isinstance(series.dtype, pd.StringDtype) and series.dtype.storage == 'pyarrow':
+		# already arrow strings, e.g. read from a memory-mapped table
+		strings = pa.array(series.array, type=pa.string())
+	else:
+		strings = pa.array(series.astype(str).where(series.notna()), type=pa.string(), from_pandas=True)
+	return pc.utf8_lower(strings), codes
+
+
+def split_words(strings):
+	# blanking the few non-word characters first is much faster than splitting on a regex
+	return pc.utf8_split_whitespace(pc.replace_substring_regex(strings, NON_WORD, ' '))
+
+
+class TextIndex:
+	"""
+	Inverted index from the words of a lowercased text column to the rows
+	they occur in, stored as one sorted array of rows per word.
+
+	Every word of a pattern lies inside some word of a row that contains
+	the pattern, so a contains search only has to check the rows found
+	under all of its words. Words that would select more than max_share of
+	the rows are not worth looking up; a pattern made only of such words,
+	or of no letters and digits at all, is left to a scan.
+	"""
+
+	def __init__(self, strings, max_share=0.25):
+		self.strings = strings
+		self.max_rows = max_share * len(strings)
+
+		words = split_words(strings)
+		rows = pc.list_parent_indices(words).to_numpy()
+		encoded = pc.dictionary_encode(pc.list_flatten(words))
+		codes = encoded.indices.to_numpy()
+		self.vocab = encoded.dictionary
+
+		# rows of a word end up ascending since rows are already in order and the sort is stable
+		order = np.argsort(codes, kind='stable')
+		codes, rows = codes[order], rows[order]
+		first = np.ones(len(codes), dtype=bool)
+		first[1:] = (codes[1:] != codes[:-1]) | (rows[1:] != rows[:-1])
+
+		self.rows = rows[first].astype('int32')
+		self.offsets = np.searchsorted(codes[first], np.arange(len(self.vocab) + 1))
+
+	def lookup(self, word):
+		# rows with a word containing word, None when there are too many to be useful
+		matches = np.flatnonzero(pc.match_substring(self.vocab, word).to_numpy(zero_copy_only=False))
+		starts, ends = self.offsets[matches], self.offsets[matches + 1]
+		if (ends - starts).sum() > self.max_rows:
+			return None
+		
+		return np.unique(np.concatenate([self.rows[start:end] for start, end in zip(starts, ends)] + [self.rows[:0]]))
+
+	def candidates(self, text):
+		# sorted rows that may contain text, None when the index can't narrow them down
+		rows = None
+		for word in split_words(pa.array([text])).flatten().to_pylist():
+			found = self.lookup(word)
+			if found is not None:
+				rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+
+		return rows
+
+	def contains(self, text):
+		# boolean row mask of the rows containing text, None when the column has to be scanned
+		rows = self.candidates(text)
+		if rows is None:
+			return None
+		
+		mask = np.zeros(len(self.strings), dtype=bool)
+		mask[rows[match_text(self.strings.take(rows), 'contains', text)]] = True
+		return mask
+
+
+def match_text(strings, operator, text):
+	# literal, case-insensitive since both sides are lowercased
+	if operator == 'contains':
+		result = pc.match_substring(strings, text)
+	elif operator == 'datestartswith':
+		result = pc.starts_with(strings, text)
+	else:
+		result = TEXT_COMPARE[operator](strings, text)
+
+	return result.fill_null(False).to_numpy(zero_copy_only=False)
+
+
+def refines(clause, base):
+	# True when every row matching clause also matches base, e.g. contains 'crash' after contains 'cras'
+	column, operator, value = clause
+	# a number typed first, e.g. 4 then 4a, was matched as a number and says nothing about the text
+	if base[0] != column or base[1] != operator or not isinstance(value, str) or not isinstance(base[2], str):
+		return False
+
+	if operator == 'contains':
+		return base[2] in value
+	if operator == 'datestartswith':
+		return value.startswith(base[2])
+	return False
+
+
+def compile_clause(df, column, operator, value):
+	"""
+	Returns (key, predicate) for one clause, or None to ignore it. key is
+	the clause with its value typed for the column, predicate(table, rows)
+	the boolean mask of the clause over rows, all rows when rows is None.
+	"""
+	if column not in df.columns:
+		return None
+
+	series = df[column]
+	number = as_number(value)
+
+	if number is not None and pd.api.types.is_numeric_dtype(series) and operator != 'datestartswith':
+		# a number only 'contains' itself
+		compare = NUMBER_COMPARE.get(operator, eq)
+		values = series.to_numpy()
+		return (column, operator, number), lambda table, rows=None: compare(values if rows is None else values[rows], number)
+
+	text = value.lower()
+
+	def predicate(table, rows=None):
+		index = table.text_index(column) if operator == 'contains' and rows is None else None
+		result = index.contains(text) if index is not None else None
+		if result is not None:
+			return result
+		
+		strings, codes = table.shadow(column)
+		if codes is not None:
+			# code -1 (missing) picks the appended False
+			result = np.append(match_text(strings, operator, text), False)
+			return result[codes if rows is None else codes[rows]]
+		
+		return match_text(strings if rows is None else strings.take(rows), operator, text)
+
+	return (column, operator, text), predicate
+
+
+def compile_filter(query, df, columns=None):
+	"""
+	Compiles a filter_query into a plan for the columns of df, or only
+	the given ones: one (key, predicate) per clause, combined with and.
+	Plans only depend on the query and the frame, so a table compiles
+	each query once.
+	"""
+	plan = [compile_clause(df, *clause) for clause in parse_filter(query)
+	        if columns is None or clause[0] in columns]
+	return [clause for clause in plan if clause is not None]
@@ -1,101 +1,22 @@
 import plotly.express as px
 import plotly.graph_objects as go
 
-from dash_scripts.dash_style import operators
-
 ##############################################################################
 
-def table_info(dff, page, size):
-	if len(dff) % size:
-		total_page = len(dff)//size+1
+def table_info(count, page, size):
+	if count % size:
+		total_page = count//size+1
 	else:
-		total_page = len(dff)//size
+		total_page = count//size
 	
 	term1 = 'page' if total_page == 1 else 'pages'
-	term2 = 'result' if len(dff) == 1 else 'results'
-	
-	return '{:,d} {} | {:,} {}'.format(total_page, term1, len(dff), term2)
-
-
-def multi_sort(dff, sort_by):
-	if len(sort_by):
-		dff = dff.sort_values(
-			[col['column_id'] for col in sort_by],
-			ascending=[
-				col['direction'] == 'asc'
-				for col in sort_by
-			],
-			inplace=False
-		)
-	return dff
-
-
-def split_filter(filter_part):
-	for operator_type in operators:
-		for operator in operator_type:
-			if operator in filter_part:
-				name_part, value_part = filter_part.split(operator, 1)
-				col_name = name_part[name_part.find('{') + 1: name_part.rfind('}')]
-
-				value_part = value_part.strip()
-				v0 = value_part[0]
-				if (col_name == 'date') or (col_name == 'version_lvl2'):
-					value = value_part
-				else:
-					try:
-						value = float(value_part)
-					except ValueError:
-						value = value_part
-				
-				if isinstance(value, str):
-					value = value.lower()
-
-				return col_name, operator_type[0].strip(), value
-
-	return [None] * 3
-
-
-def search_filter_sm(filter, df):
-	dff = df
-	filtering_expressions = filter.split(' && ')
-	
-	for filter_part in filtering_expressions:
-		col_name, operator, filter_value = split_filter(filter_part)
-
-		# if there is search input
-		if operator == 'contains':
-			if isinstance(filter_value, float):
-				dff = dff[dff[col_name]==float(filter_value)]
-			else:
-				df_lower = dff.copy()[col_name].str.lower()
-				dff = dff.loc[df_lower.str.contains(filter_value)]
-		
-	return dff
-
-
-def search_filter_lg(filter, df):
-	dff = df
-	filtering_expressions = filter.split(' && ')
-
-	for filter_part in filtering_expressions:
-		col_name, operator, filter_value = split_filter(filter_part)
-		
-		if (col_name == 'date') or (col_name == 'version_lvl2') or (col_name == 'version_lvl3'):
-			filter_value = str(filter_value)
-
-		# if there is search input
-		if operator == 'contains':
-			if isinstance(filter_value, float):
-				dff = dff[dff[col_name]==int(filter_value)]
-			else:
-				df_lower = dff.copy()[col_name].str.lower()
-				dff = dff.loc[df_lower.str.contains(filter_value)]
+	term2 = 'result' if count == 1 else 'results'
 	
-	return dff
+	return '{:,d} {} | {:,} {}'.format(total_page, term1, count, term2)
 
 
-def bar_rating(df):
-	rating = df['rating'].value_counts()
+def bar_rating(cube):
+	rating = cube.groupby('rating')['count'].sum().sort_values(ascending=False)
 	
 	fig = px.bar(x=rating.index, y=rating,
 				 title='Rating Distribution',
@@ -103,10 +24,15 @@ def bar_rating(df):
 	return fig
 	
 
-def bar_sentiment(df):
-	pos = df[df['sentiment']=='Positive']['day'].value_counts()
-	neu = df[df['sentiment']=='Neutral']['day'].value_counts()
-	neg = df[df['sentiment']=='Negative']['day'].value_counts()
+def day_counts(cube, sentiment):
+	dff = cube[cube['sentiment']==sentiment]
+	return dff.groupby('day', observed=True)['count'].sum().sort_values(ascending=False)
+
+
+def bar_sentiment(cube):
+	pos = day_counts(cube, 'Positive')
+	neu = day_counts(cube, 'Neutral')
+	neg = day_counts(cube, 'Negative')
 	
 	fig = go.Figure(data=[
 		go.Bar(name='Positive', x=pos.index, y=pos, marker_color='#00CC96'),
@@ -122,10 +48,11 @@ def bar_sentiment(df):
 	return fig
 
 
-def bar_version(df, col_name, title):
-	dff = df.groupby(col_name)['rating'].mean()
+def bar_version(cube, col_name, title):
+	dff = cube.groupby(col_name, observed=True)[['count', 'rating_sum']].sum()
+	dff = dff['rating_sum'] / dff['count']
 	
 	fig = px.bar(x=dff.index, y=dff, title=title,
 				 labels={'x':'Version', 'y':'Average Rating'})
 	
-	return fig
\ No newline at end of file
+	return fig
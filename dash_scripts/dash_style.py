@@ -64,5 +64,12 @@ CELL_STYLE = {
 }
 
 operators = [
-	['contains ']
+	['ge ', '>='],
+	['le ', '<='],
+	['lt ', '<'],
+	['gt ', '>'],
+	['ne ', '!='],
+	['eq ', '='],
+	['contains '],
+	['datestartswith '],
 ]
\ No newline at end of file
@@ -0,0 +1,24 @@
+import sys
+import time
+
+##############################################################################
+
+# (stage, seconds) of starting the dashboard, in order
+STAGES = []
+
+marked = time.perf_counter()
+
+
+def mark(stage):
+	# records the time since the previous mark, or since this module was imported, as stage
+	global marked
+	now = time.perf_counter()
+	STAGES.append((stage, now - marked))
+	marked = now
+
+
+def report(file=sys.stderr):
+	total = sum(seconds for _, seconds in STAGES)
+	print('Dashboard started in {:.2f} s'.format(total), file=file)
+	for stage, seconds in STAGES:
+		print('  {:<28} {:>7.2f} s {:>5.0%}'.format(stage, seconds, seconds / total if total else 0), file=file)
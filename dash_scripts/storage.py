@@ -0,0 +1,130 @@
+import argparse
+import glob
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+##############################################################################
+
+# low-cardinality columns, stored as categoricals
+CATEGORICAL_COLUMNS = ['app_name', 'country', 'sentiment', 'day',
+                       'version_lvl1', 'version_lvl2', 'version_lvl3']
+
+# integer columns narrowed to the smallest type that fits; summary tables keep their float ratings
+INTEGER_COLUMNS = {'stars': 'int8', 'rating': 'int8', 'topic_id': 'int32'}
+
+# columns that look numeric in a csv but must stay text, e.g. version 3.10
+STRING_COLUMNS = ['version', 'date', 'version_lvl1', 'version_lvl2', 'version_lvl3']
+
+# columns identifying a review across runs of the scraper
+REVIEW_KEY = ['app_id', 'username', 'date', 'title', 'review']
+
+
+def set_dtypes(df):
+	dtypes = {col: dtype for col, dtype in INTEGER_COLUMNS.items()
+	          if col in df.columns and pd.api.types.is_integer_dtype(df[col])}
+	dtypes.update({col: 'category' for col in CATEGORICAL_COLUMNS if col in df.columns})
+	
+	return df.astype(dtypes)
+
+
+def review_keys(df):
+	# one int64 per review, hashed from its REVIEW_KEY columns, that other tables refer to it by
+	return pd.util.hash_pandas_object(df[REVIEW_KEY], index=False).to_numpy().view('int64')
+
+
+def table_file(name):
+	# name is the path without extension, e.g. 'data/all_reviews'
+	for extension in ['.arrow', '.parquet']:
+		if os.path.exists(name + extension):
+			return name + extension
+	return name + '.csv'
+
+
+def open_arrow(name):
+	# the Arrow IPC copy of a table, read in place from the memory-mapped file
+	return pa.ipc.open_file(pa.memory_map(name + '.arrow')).read_all()
+
+
+def table_columns(name):
+	path = table_file(name)
+	if path.endswith('.arrow'):
+		return open_arrow(name).schema.names
+	if path.endswith('.parquet'):
+		return pq.read_schema(path).names
+	return list(pd.read_csv(path, encoding='utf8', nrows=0).columns)
+
+
+def read_arrow(name, columns=None):
+	"""
+	Frame over the memory-mapped Arrow copy of a table. Numbers and text
+	(as pyarrow-backed strings) point into the mapped file instead of
+	being copied, so processes reading the same file share its pages
+	through the page cache, and a reload only maps it again.
+	"""
+	table = open_arrow(name)
+	if columns is not None:
+		table = table.select(columns)
+	
+	return table.to_pandas(split_blocks=True, types_mapper={pa.string(): pd.StringDtype('pyarrow')}.get)
+
+
+def read_table(name, columns=None):
+	path = table_file(name)
+	if path.endswith('.arrow'):
+		return read_arrow(name, columns)
+	if path.endswith('.parquet'):
+		return pd.read_parquet(path, columns=columns)
+	
+	# fall back to a csv export, e.g. a copy of /example-data
+	df = pd.read_csv(name + '.csv', encoding='utf8', usecols=columns,
+	                 dtype={col: str for col in STRING_COLUMNS})
+	if columns is not None:
+		df = df[columns]
+	
+	return set_dtypes(df)
+
+
+def write_table(df, name):
+	os.makedirs(os.path.dirname(name) or '.', exist_ok=True)
+	set_dtypes(df).to_parquet(name + '.parquet', index=False)
+	
+	# keep an Arrow copy the dashboard maps in sync
+	if os.path.exists(name + '.arrow'):
+		write_arrow(df, name)
+
+
+def write_arrow(df, name):
+	# written next to the old copy and renamed over it, so processes mapping the old one keep their pages
+	table = pa.Table.from_pandas(set_dtypes(df), preserve_index=False)
+	with pa.OSFile(name + '.arrow.tmp', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+		writer.write_table(table)
+	os.replace(name + '.arrow.tmp', name + '.arrow')
+
+
+def export_csv(name):
+	read_table(name).to_csv(name + '.csv', index=False, encoding='utf8')
+
+
+def export_arrow(name):
+	write_arrow(pd.read_parquet(name + '.parquet'), name)
+
+
+if __name__ == '__main__':
+	# python -m dash_scripts.storage [--arrow] [name ...] exports tables, every table under data/ by default
+	parser = argparse.ArgumentParser()
+	parser.add_argument('names', nargs='*')
+	parser.add_argument('--arrow', action='store_true',
+	                    help='write the Arrow copies the dashboard memory-maps instead of csv exports')
+	args = parser.parse_args()
+	
+	names = args.names or [path[:-len('.parquet')] for path in glob.glob('data/**/*.parquet', recursive=True)]
+	for name in names:
+		if args.arrow:
+			export_arrow(name)
+			print('Exported {}.arrow'.format(name))
+		else:
+			export_csv(name)
+			print('Exported {}.csv'.format(name))
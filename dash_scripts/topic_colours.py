@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+##############################################################################
+
+# share of the colormap between the colours of consecutive topic ids; the golden ratio keeps any run of ids apart
+STEP = (np.sqrt(5) - 1) / 2
+
+
+def rainbow(x):
+	"""
+	Colours at positions x in [0, 1] of matplotlib's 'rainbow' colormap,
+	a 256-entry table of (|2x - 0.5|, sin(pi x), cos(pi x / 2)), without
+	importing matplotlib.
+	"""
+	table = np.linspace(0, 1, 256)
+	table = np.clip(np.stack([np.abs(2 * table - 0.5), np.sin(np.pi * table), np.cos(np.pi * table / 2)], axis=1), 0, 1)
+	return table[np.minimum((np.asarray(x) * 256).astype(int), 255)]
+
+
+def colour_map(topic_ids):
+	# (topic_id, r, g, b) of every topic; a topic's colour only depends on its id, so it is the same on every run
+	topic_ids = np.unique(np.asarray(topic_ids, dtype='int64'))
+	rgb = np.rint(rainbow(np.mod(topic_ids * STEP, 1)) * 255).astype('uint8')
+	return pd.DataFrame({'topic_id': topic_ids, 'r': rgb[:, 0], 'g': rgb[:, 1], 'b': rgb[:, 2]})
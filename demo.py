@@ -6,31 +6,34 @@ Matplotlib colormap
 https://matplotlib.org/stable/gallery/color/colormap_reference.html
 """
 
+from dash_scripts import startup
+
 import dash
+import flask
 import dash_table as dt
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State
 
-import pandas as pd
-import seaborn as sns
-import random
-
 from dash_scripts.dash_style import (SIDEBAR_STYLE, SIDEBAR_HIDDEN,
                                      CONTENT_STYLE_PARTIAL, CONTENT_STYLE_FULL,
                                      DATATABLE_TITLE_STYLE, INPUT_NUMBER_STYLE,
                                      HOME_TEXT, CELL_STYLE,
                                      PAGE_SIZE_SM, PAGE_SIZE_LG)
+startup.mark('import dash')
 import dash_scripts.dash_functions as dun
+startup.mark('import plotly')
+from dash_scripts.dash_data import DataStore, FigureCache
+startup.mark('import pyarrow')
                            
 ##############################################################################
 
 with open('apps.txt') as fileIn:
     apps = dict(line.strip().split(',') for line in fileIn)
 
-reviews = None
-palette = None
+store = DataStore('data')
+figure_cache = FigureCache()
 
 app = dash.Dash(external_stylesheets=[dbc.themes.BOOTSTRAP, 'style.css'],
                 suppress_callback_exceptions=True)
@@ -73,23 +76,10 @@ content_home = html.Div([
 ])
 
 def content_data():
-    global reviews
-    global palette
-    
-    reviews = pd.read_csv('data/all_reviews_topics.csv', encoding='utf8')
-    reviews['index'] = range(1, len(reviews)+1)
-    reviews['date'] = reviews['date'].astype(str)
-    reviews['version_lvl1'] = reviews['version_lvl1'].astype(str).astype(int)
-    reviews = reviews[['index','title','review','username',
-                       'app_name','country',
-                       'rating','sentiment',
-                       'date','day',
-                       'version_lvl1','version_lvl2','version_lvl3',
-                       'topic_id', 'topic_keywords']]
-
-    palette = sns.color_palette('rainbow', reviews['topic_id'].nunique())
-    random.shuffle(palette)
+    # the data page only changes with the reviews and topic colours, so it is built once per load of them
+    return store.derived('content_data', (store.reviews(), store.topic_colours()), data_layout)
 
+def data_layout(reviews, colours):
     return html.Div([
         dt.DataTable(
             id='table-reviews',
@@ -141,9 +131,9 @@ def content_data():
                             'column_id':'topic_id',
                             'filter_query':'{{topic_id}}={}'.format(id),
                         },
-                        'backgroundColor': 'rgba({},{},{},{})'.format(palette[index][0]*255, palette[index][1]*255, palette[index][2]*255, 0.3),
+                        'backgroundColor': 'rgba({},{},{},{})'.format(r, g, b, 0.3),
                     }
-                    for index, id in enumerate(reviews['topic_id'].unique())
+                    for id, r, g, b in colours[['topic_id', 'r', 'g', 'b']].itertuples(index=False)
                 ]
             ),
             
@@ -179,6 +169,9 @@ content_analysis = html.Div([
     ),
     html.Br(),
     
+    # keys of the figures the charts show, reset whenever the page is rendered
+    dcc.Store(id='figure-keys'),
+    
     # tabs for various analysis
     dcc.Tabs(id='tabs', value='tab-1', children=[
         dcc.Tab(id='tab1', label='Ratings', value='tab-1', children=[
@@ -347,6 +340,8 @@ app.layout = html.Div(
     ]
 )
 
+startup.mark('build layouts')
+
 
 @app.callback(
     [
@@ -390,104 +385,106 @@ def render_page_content(pathname):
         return content_analysis
 
 
+CHARTS = {
+    'bar-rating': dun.bar_rating,
+    'bar-sentiment': dun.bar_sentiment,
+    'bar-ver1': lambda cube: dun.bar_version(cube, 'version_lvl1', 'Average Rating by App Version Level 1'),
+    'bar-ver2': lambda cube: dun.bar_version(cube, 'version_lvl2', 'Average Rating by App Version Level 2'),
+    'bar-ver3': lambda cube: dun.bar_version(cube, 'version_lvl3', 'Average Rating by App Version Level 3'),
+}
+
+
+@app.callback(
+    [Output(chart, 'figure') for chart in CHARTS] + [Output('figure-keys', 'data')],
+    Input('dropdown', 'value'),
+    State('figure-keys', 'data'),
+)
+def update_charts(app_name, shown):
+    # figure-keys holds the key of every figure the browser shows; those are not sent again
+    version, cube = store.cube()
+    shown = shown or {}
+    keys = {chart: '{}|{}|{}'.format(app_name, chart, version) for chart in CHARTS}
+    
+    timings = {}
+    figures = [
+        dash.no_update if shown.get(chart) == keys[chart] else
+        figure_cache.get(keys[chart], lambda: build(cube[cube['app_name'] == app_name]), timings)
+        for chart, build in CHARTS.items()
+    ]
+    
+    # shown in the browser's network tab as Server-Timing when debugging
+    if timings and flask.has_request_context():
+        for name, seconds in timings.items():
+            dash.callback_context.record_timing('figure_' + name, seconds)
+    
+    return figures + [keys]
+
+
+################################ SEMANTIC ################################
+
+def table_page(table, filter, sort_by, page, size):
+    columns = [{'name':i, 'id':i} for i in table.columns]
+    dff, count = table.page(filter, sort_by, page, size)
+    info = dun.table_info(count, page, size)
+    
+    return dff.to_dict('records'), columns, info
+
+
+# link words summary
 @app.callback(
     [
-        Output('bar-rating', 'figure'),
-        Output('bar-sentiment', 'figure'),
-        Output('bar-ver1', 'figure'),
-        Output('bar-ver2', 'figure'),
-        Output('bar-ver3', 'figure'),
-        
         Output('table-linkwords', 'data'),
         Output('table-linkwords', 'columns'),
         Output('lw1_info', 'children'),
-        
-        Output('table-lw-all', 'data'),
-        Output('table-lw-all', 'columns'),
-        Output('lw2_info', 'children'),
-        
-        Output('table-topics', 'data'),
-        Output('table-topics', 'columns'),
-        Output('topic_info', 'children'),
     ],
     [
         Input('dropdown', 'value'),
-        
         Input('table-linkwords', 'filter_query'),
         Input('table-linkwords', 'page_current'),
         Input('table-linkwords', 'sort_by'),
         Input('table-linkwords', 'page_size'),
-        
+    ]
+)
+def update_linkword_summary(app_name, filter, page, sort_by, size):
+    return table_page(store.table(store.linkword_summary(app_name)), filter, sort_by, page, size)
+
+
+# link words table
+@app.callback(
+    [
+        Output('table-lw-all', 'data'),
+        Output('table-lw-all', 'columns'),
+        Output('lw2_info', 'children'),
+    ],
+    [
+        Input('dropdown', 'value'),
         Input('table-lw-all', 'filter_query'),
         Input('table-lw-all', 'page_current'),
         Input('table-lw-all', 'sort_by'),
         Input('table-lw-all', 'page_size'),
-        
+    ]
+)
+def update_linkwords(app_name, filter, page, sort_by, size):
+    return table_page(store.linkwords(app_name), filter, sort_by, page, size)
+
+
+# topics table
+@app.callback(
+    [
+        Output('table-topics', 'data'),
+        Output('table-topics', 'columns'),
+        Output('topic_info', 'children'),
+    ],
+    [
+        Input('dropdown', 'value'),
         Input('table-topics', 'filter_query'),
         Input('table-topics', 'page_current'),
         Input('table-topics', 'sort_by'),
         Input('table-topics', 'page_size'),
     ]
 )
-def update_charts(app_name,
-                  filter_lw1, page_lw1, sort_lw1, size_lw1,
-                  filter_lw2, page_lw2, sort_lw2, size_lw2,
-                  filter_topic, page_topic, sort_topic, size_topic,
-                  ):
-    # filter dataframe for an app
-    mask = reviews[reviews['app_name'] == app_name]
-    app = app_name.lower()
-    
-    fig1 = dun.bar_rating(mask)
-    fig2 = dun.bar_sentiment(mask)
-    fig3 = dun.bar_version(mask, 'version_lvl1', 'Average Rating by App Version Level 1')
-    fig4 = dun.bar_version(mask, 'version_lvl2', 'Average Rating by App Version Level 2')
-    fig5 = dun.bar_version(mask, 'version_lvl3', 'Average Rating by App Version Level 3')
-    
-    ################################ SEMANTIC ################################
-    
-    # link words summary
-    lw1 = pd.read_csv('data/linkwords/linkwords_summary_{}.csv'.format(app), encoding='utf8')
-    lw1['index'] = range(1, len(lw1) + 1)
-    lw1 = lw1[['index','link_words','count','rating','sentiment']]
-    col_lw1 = [{'name':i, 'id':i} for i in lw1.columns]
-    search_lw1 = dun.search_filter_sm(filter_lw1, lw1)
-    search_lw1 = dun.multi_sort(search_lw1, sort_lw1)
-    PAGE_LW1 = page_lw1
-    SIZE_LW1 = size_lw1
-    info_lw1 = dun.table_info(search_lw1, PAGE_LW1, SIZE_LW1)
-    
-    # link words table
-    lw2 = pd.read_csv('data/linkwords/linkwords_{}.csv'.format(app), encoding='utf8')
-    lw2['index'] = range(1, len(lw2) + 1)
-    lw2 = lw2[['index','title','review','username','app_name',
-               'country','rating','sentiment',
-               'date','day',
-               'version_lvl1','version_lvl2','version_lvl3',
-               'link_words']]
-    col_lw2 = [{'name':i, 'id':i} for i in lw2.columns]
-    search_lw2 = dun.search_filter_lg(filter_lw2, lw2)
-    search_lw2 = dun.multi_sort(search_lw2, sort_lw2)
-    PAGE_LW2 = page_lw2
-    SIZE_LW2 = size_lw2
-    info_lw2 = dun.table_info(search_lw2, PAGE_LW2, SIZE_LW2)
-    
-    # topics table
-    topics = pd.read_csv('data/topics/topics_{}.csv'.format(app), encoding='utf8')
-    topics = topics.iloc[1:]
-    topics['index'] = range(1, len(topics) + 1)
-    topics = topics[['index','topic_id','topic_keywords','count']]
-    col_topic = [{'name':i, 'id':i} for i in topics.columns]
-    search_topic = dun.search_filter_sm(filter_topic, topics)
-    search_topic = dun.multi_sort(search_topic, sort_topic)
-    PAGE_TOPIC = page_topic
-    SIZE_TOPIC = size_topic
-    info_topic = dun.table_info(search_topic, PAGE_TOPIC, SIZE_TOPIC)
-    
-    return fig1, fig2, fig3, fig4, fig5, \
-           search_lw1.iloc[PAGE_LW1*SIZE_LW1 : (PAGE_LW1+1)*SIZE_LW1].to_dict('records'), col_lw1, info_lw1, \
-           search_lw2.iloc[PAGE_LW2*SIZE_LW2 : (PAGE_LW2+1)*SIZE_LW2].to_dict('records'), col_lw2, info_lw2, \
-           search_topic.iloc[PAGE_TOPIC*SIZE_TOPIC : (PAGE_TOPIC+1)*SIZE_TOPIC].to_dict('records'), col_topic, info_topic
+def update_topics(app_name, filter, page, sort_by, size):
+    return table_page(store.table(store.topics(app_name)), filter, sort_by, page, size)
 
 
 @app.callback(
@@ -503,14 +500,31 @@ def update_charts(app_name,
     ]
 )
 def update_main_table(page_current, page_size, sort_by, filter):
-    dff = dun.search_filter_lg(filter, reviews)
-    dff = dun.multi_sort(dff, sort_by)
-
     page = page_current
     size = page_size
-    info = dun.table_info(dff, page, size)
+    dff, count = store.table(store.reviews()).page(filter, sort_by, page, size)
+    info = dun.table_info(count, page, size)
+    
+    return dff.to_dict('records'), info
+
+
+startup.mark('register callbacks')
+
+
+def preload():
+    # loads every dataset, and the structures of the reviews table, e.g. before gunicorn forks its workers
+    content_data()
+    store.cube()
+    reviews = store.table(store.reviews())
+    for column in reviews.indexed:
+        reviews.text_index(column)
+    
+    for app_name in apps:
+        store.linkword_summary(app_name)
+        store.linkwords(app_name)
+        store.topics(app_name)
     
-    return dff.iloc[page*size : (page+1)*size].to_dict('records'), info
+    startup.mark('load data')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,19 @@
+"""
+gunicorn settings of the dashboard, e.g.
+gunicorn -c gunicorn.conf.py wsgi:server
+
+WEB_CONCURRENCY sets the number of workers and DASH_BIND the address.
+"""
+
+import multiprocessing
+import os
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = os.environ.get('DASH_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# import wsgi, i.e. load the data and build the layouts, once in the master; the forked workers share them
+preload_app = True
+
+# the first filter of a large table builds its word index
+timeout = 120
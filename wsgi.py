@@ -0,0 +1,13 @@
+"""
+WSGI entry point of the dashboard, without the debug server of demo.py.
+
+gunicorn -c gunicorn.conf.py wsgi:server
+"""
+
+from demo import app, preload
+from dash_scripts import startup
+
+preload()
+startup.report()
+
+server = app.server